@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+
+from .pools import PoolCapacity
+
+logger = logging.getLogger(__name__)
+
+# Utilization band used for hysteresis: grow above HIGH, shrink only below LOW.
+HIGH_UTILIZATION = 0.9
+LOW_UTILIZATION = 0.5
+
+
+class PoolAutoscaler:
+    """Grows and shrinks the effective pool size from acquire wait and utilization.
+
+    Growth is multiplicative and happens after ``scale_up_after`` busy windows;
+    shrinking removes one connection after ``scale_down_after`` quiet windows.
+    Physically idle connections are closed by the pool's
+    ``max_inactive_connection_lifetime``.
+    """
+
+    def __init__(
+        self,
+        capacity: PoolCapacity,
+        *,
+        min_size: int,
+        max_size: int,
+        interval: float = 1.0,
+        target_wait: float = 0.005,
+        scale_up_after: int = 1,
+        scale_down_after: int = 30,
+    ) -> None:
+        if not 1 <= min_size <= max_size:
+            raise ValueError("min_size must be between 1 and max_size")
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        self.capacity = capacity
+        self.min_size = min_size
+        self.max_size = max_size
+        self.interval = interval
+        self.target_wait = target_wait
+        self.scale_up_after = scale_up_after
+        self.scale_down_after = scale_down_after
+        self._busy_windows = 0
+        self._quiet_windows = 0
+        self._task: asyncio.Task[None] | None = None
+        capacity.resize(min(max(capacity.limit, min_size), max_size))
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="pg-pool-autoscaler")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+    def evaluate(self) -> int:
+        capacity = self.capacity
+        limit = capacity.limit
+        average_wait = (
+            capacity.window_wait_sum / capacity.window_waits if capacity.window_waits else 0.0
+        )
+        utilization = capacity.window_peak / limit
+        capacity.reset_window()
+
+        if average_wait > self.target_wait or capacity.queued or utilization >= HIGH_UTILIZATION:
+            self._busy_windows += 1
+            self._quiet_windows = 0
+        elif average_wait <= self.target_wait and utilization <= LOW_UTILIZATION:
+            self._quiet_windows += 1
+            self._busy_windows = 0
+        else:
+            self._busy_windows = self._quiet_windows = 0
+
+        target = limit
+        if self._busy_windows >= self.scale_up_after:
+            target = min(self.max_size, limit * 2)
+            self._busy_windows = 0
+        elif self._quiet_windows >= self.scale_down_after:
+            target = max(self.min_size, limit - 1)
+            self._quiet_windows = 0
+
+        if target != limit:
+            logger.info("Resizing effective PostgreSQL pool from %d to %d", limit, target)
+            capacity.resize(target)
+        return target
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.evaluate()
+            except Exception:
+                logger.exception("PostgreSQL pool autoscaler iteration failed")
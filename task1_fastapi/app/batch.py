@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from typing import Any
+
+import asyncpg
+from fastapi import HTTPException, Request, status
+from pydantic import BaseModel, Field
+
+from .dependencies import LazyPgConnection
+from .responses import FastJSONResponse, encode_json
+from .statements import StatementRegistry
+
+
+class BatchQuery(BaseModel):
+    name: str
+    params: list[Any] = Field(default_factory=list)
+
+
+class BatchRequest(BaseModel):
+    queries: list[BatchQuery] = Field(min_length=1)
+
+
+async def run_batch(
+    request: Request,
+    connection: LazyPgConnection,
+    batch: BatchRequest,
+    *,
+    max_queries: int,
+) -> FastJSONResponse:
+    """Run named statements back to back on one pooled connection.
+
+    asyncpg keeps a single query in flight per connection, so the statements are
+    not pipelined; the batch saves the HTTP round trips and pool acquires, and each
+    statement reuses the connection's prepared statement. A statement rejected by
+    Postgres reports its error in place and does not fail the rest of the batch.
+    """
+    if len(batch.queries) > max_queries:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"A batch may contain at most {max_queries} queries",
+        )
+    statements: StatementRegistry = request.app.state.statements
+    unknown = sorted(
+        {query.name for query in batch.queries if not statements.is_batchable(query.name)}
+    )
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown batch queries: {', '.join(unknown)}",
+        )
+
+    pg_connection = await connection.connection()
+    results: list[dict[str, Any]] = []
+    for query in batch.queries:
+        try:
+            records = await statements.fetch(pg_connection, query.name, *query.params)
+        except (asyncpg.PostgresError, asyncpg.InterfaceError) as exc:
+            # Bad parameters are reported per query; a broken connection fails the batch.
+            if pg_connection.is_closed():
+                raise
+            results.append({"name": query.name, "error": str(exc)})
+            continue
+        results.append({"name": query.name, "rows": [dict(record) for record in records]})
+    await connection.release()
+    # Rows may hold values without a JSON form (numeric, timestamps): encode them as strings.
+    return FastJSONResponse(encode_json({"results": results}, lenient=True))
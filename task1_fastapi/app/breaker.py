@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import math
+import time
+from collections.abc import Callable
+from enum import StrEnum
+
+import asyncpg
+
+# Errors that point at an unreachable or overloaded server rather than a bad query.
+# A query that outlives ``command_timeout`` raises TimeoutError, an OSError, so slow
+# queries count too. Errors Postgres reports for a query, statement_timeout
+# cancellations included, are left to the route and do not move the breaker.
+DATABASE_FAILURE_ERRORS: tuple[type[BaseException], ...] = (
+    OSError,
+    asyncpg.InterfaceError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.CannotConnectNowError,
+    asyncpg.TooManyConnectionsError,
+)
+
+
+class CircuitState(StrEnum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of touching the database while the circuit is open."""
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__("Database circuit breaker is open")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Fails fast after consecutive database failures and probes before closing again."""
+
+    def __init__(
+        self,
+        *,
+        failure_threshold: int = 5,
+        reset_timeout: float = 10.0,
+        half_open_max_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if failure_threshold <= 0:
+            raise ValueError("failure_threshold must be positive")
+        if reset_timeout <= 0:
+            raise ValueError("reset_timeout must be positive")
+        if half_open_max_calls <= 0:
+            raise ValueError("half_open_max_calls must be positive")
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._half_open_max_calls = half_open_max_calls
+        self._clock = clock
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probes = 0
+        self.times_opened = 0
+        self.rejected = 0
+
+    def before_call(self) -> None:
+        if self.state is CircuitState.CLOSED:
+            return
+        if self.state is CircuitState.OPEN:
+            remaining = self.opened_at + self._reset_timeout - self._clock()
+            if remaining > 0:
+                self.rejected += 1
+                raise CircuitOpenError(max(1, math.ceil(remaining)))
+            self.state = CircuitState.HALF_OPEN
+            self.probes = 0
+        if self.probes >= self._half_open_max_calls:
+            self.rejected += 1
+            raise CircuitOpenError(max(1, math.ceil(self._reset_timeout)))
+        self.probes += 1
+
+    def record_success(self) -> None:
+        self.failures = 0
+        if self.state is CircuitState.HALF_OPEN:
+            self.state = CircuitState.CLOSED
+            self.probes = 0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state is CircuitState.HALF_OPEN or self.failures >= self._failure_threshold:
+            self._open()
+
+    def record_neutral(self) -> None:
+        # A probe that ended without a verdict gives its slot back to the next request.
+        if self.state is CircuitState.HALF_OPEN and self.probes > 0:
+            self.probes -= 1
+
+    def _open(self) -> None:
+        if self.state is not CircuitState.OPEN:
+            self.times_opened += 1
+        self.state = CircuitState.OPEN
+        self.opened_at = self._clock()
+        self.probes = 0
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import dataclass
+
+
+@dataclass(slots=True)
+class _Entry[T]:
+    value: T
+    expires_at: float
+
+
+class TTLCache[T]:
+    """In-process cache with per-entry TTL and single-flight loading.
+
+    Concurrent misses for the same key share one loader call; a failed load
+    is propagated to every waiter and is not cached. A load is cancelled once
+    every caller waiting for it has been cancelled.
+    """
+
+    def __init__(self, ttl: float, *, clock: Callable[[], float] = time.monotonic) -> None:
+        if ttl < 0:
+            raise ValueError("ttl must be non-negative")
+        self._ttl = ttl
+        self._clock = clock
+        self._entries: dict[Hashable, _Entry[T]] = {}
+        self._inflight: dict[Hashable, asyncio.Future[T]] = {}
+        self._waiters: dict[asyncio.Future[T], int] = {}
+        self._generation = 0
+
+    @property
+    def ttl(self) -> float:
+        return self._ttl
+
+    @property
+    def generation(self) -> int:
+        """Bumped by every ``invalidate()``: a load that sees it change read stale data."""
+        return self._generation
+
+    def get(self, key: Hashable) -> T | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= self._clock():
+            del self._entries[key]
+            return None
+        return entry.value
+
+    def set(self, key: Hashable, value: T) -> None:
+        if self._ttl > 0:
+            self._entries[key] = _Entry(value, self._clock() + self._ttl)
+
+    def invalidate(self, key: Hashable | None = None) -> None:
+        # Loads already in flight may have read the old data: their results are not stored.
+        self._generation += 1
+        if key is None:
+            self._entries.clear()
+            self._inflight.clear()
+        else:
+            self._entries.pop(key, None)
+            self._inflight.pop(key, None)
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[T]]) -> T:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at > self._clock():
+            return entry.value
+
+        task = self._inflight.get(key)
+        if task is None:
+            # The load runs in its own task so a cancelled caller does not abort it for the others.
+            task = asyncio.ensure_future(loader())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._complete(key, done))
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters[task] == 1:
+                # Nobody else needs the result: stop the load, e.g. a running query.
+                # Unwinding it can take a round trip, so new callers start a fresh load.
+                if self._inflight.get(key) is task:
+                    del self._inflight[key]
+                task.cancel()
+            raise
+        finally:
+            waiters = self._waiters.pop(task) - 1
+            if waiters:
+                self._waiters[task] = waiters
+
+    def _complete(self, key: Hashable, task: asyncio.Future[T]) -> None:
+        if self._inflight.get(key) is not task:
+            return
+        del self._inflight[key]
+        if task.cancelled() or task.exception() is not None:
+            return
+        self.set(key, task.result())
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+
+from fastapi import Request, Response, status
+
+from .responses import FastJSONResponse
+
+
+@dataclass(frozen=True, slots=True)
+class CachedBody:
+    """Serialized response body together with its strong ETag."""
+
+    body: bytes
+    etag: str
+
+    @classmethod
+    def from_body(cls, body: bytes) -> CachedBody:
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        return cls(body=body, etag=f'"{digest}"')
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        # If-None-Match uses weak comparison, so W/ prefixes are ignored.
+        if candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def cache_control(max_age: int) -> str:
+    return f"max-age={max_age}" if max_age > 0 else "no-cache"
+
+
+def conditional_json_response(request: Request, cached: CachedBody, *, max_age: int) -> Response:
+    headers = {"ETag": cached.etag, "Cache-Control": cache_control(max_age)}
+    if etag_matches(request, cached.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return FastJSONResponse(cached.body, headers=headers)
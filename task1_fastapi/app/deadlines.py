@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable, Coroutine
+from typing import Any
+
+from fastapi import HTTPException, Request, Response, status
+from fastapi.routing import APIRoute
+
+from .settings import DeadlineSettings
+
+logger = logging.getLogger(__name__)
+
+# Methods whose handlers never read the body, so ``receive()`` is free to watch for disconnects.
+BODYLESS_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+# Status recorded for requests abandoned by the client (nginx convention); it is never delivered.
+CLIENT_CLOSED_REQUEST = 499
+
+DEADLINE = "deadline"
+DISCONNECT = "disconnect"
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+def _record_cancel(request: Request, route: str, reason: str) -> None:
+    metrics = getattr(request.app.state, "metrics", None)
+    if metrics is not None:
+        metrics.requests_cancelled.labels(route, reason).inc()
+
+
+async def run_cancellable(
+    request: Request,
+    call: Coroutine[Any, Any, Response],
+    *,
+    route: str,
+    deadline: float | None,
+    watch_disconnect: bool,
+) -> Response:
+    """Run a route handler, cancelling it on the deadline or when the client disconnects.
+
+    Cancelling the handler task cancels the awaited asyncpg call; asyncpg then sends
+    a cancel request to the server, and the connection goes back to the pool as
+    soon as the handler's context managers and dependencies unwind.
+    """
+    task = asyncio.ensure_future(call)
+    waiters: set[asyncio.Future[Any]] = {task}
+    disconnected = None
+    if watch_disconnect:
+        disconnected = asyncio.ensure_future(_wait_for_disconnect(request))
+        waiters.add(disconnected)
+    try:
+        done, _ = await asyncio.wait(waiters, timeout=deadline, return_when=asyncio.FIRST_COMPLETED)
+    except BaseException:
+        task.cancel()
+        raise
+    finally:
+        if disconnected is not None:
+            disconnected.cancel()
+    if task in done:
+        return task.result()
+
+    reason = DISCONNECT if disconnected in done else DEADLINE
+    task.cancel()
+    # Wait for the handler to unwind, so the connection is released before we answer.
+    await asyncio.gather(task, return_exceptions=True)
+    _record_cancel(request, route, reason)
+    if reason == DISCONNECT:
+        logger.info("Client disconnected, cancelled %s %s", request.method, request.url.path)
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    raise HTTPException(
+        status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+        detail="Request deadline exceeded",
+    )
+
+
+class DeadlineRoute(APIRoute):
+    """API route whose handler is cancelled on its deadline or on client disconnect.
+
+    Deadlines come from ``DeadlineSettings`` on ``app.state.deadlines``, keyed by
+    route name. Watching for a disconnect costs an extra task per request, so only
+    routes with a deadline or listed in ``REQUEST_CANCEL_ON_DISCONNECT`` do it; the
+    rest run their handler directly. Only the handler is covered: a streaming body
+    runs after it returns and relies on Starlette's own disconnect handling.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Awaitable[Response]]:
+        handler = super().get_route_handler()
+        route = self.name
+
+        async def deadline_handler(request: Request) -> Response:
+            settings: DeadlineSettings | None = getattr(request.app.state, "deadlines", None)
+            if settings is None or not settings.cancels_on_disconnect(route):
+                return await handler(request)
+            deadline = settings.for_route(route)
+            watch_disconnect = request.method in BODYLESS_METHODS
+            if deadline is None and not watch_disconnect:
+                return await handler(request)
+            return await run_cancellable(
+                request,
+                handler(request),
+                route=route,
+                deadline=deadline,
+                watch_disconnect=watch_disconnect,
+            )
+
+        return deadline_handler
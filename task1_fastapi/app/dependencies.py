@@ -1,13 +1,74 @@
 from __future__ import annotations
 
-from collections.abc import AsyncIterator
+import time
+from collections.abc import AsyncIterator, Callable
+from contextlib import AsyncExitStack, asynccontextmanager, nullcontext
+from typing import Any
 
 from fastapi import Depends, HTTPException, Request, status
 
 import asyncpg
 
+from .breaker import DATABASE_FAILURE_ERRORS, CircuitBreaker, CircuitOpenError
+from .cache import TTLCache
+from .conditional import CachedBody
+from .pools import AcquireLimiter, Bulkheads, PoolSaturatedError, ReadPoolRouter
+from .tenants import TenantPoolManager, UnknownTenantError
+from .timing import DB_ACQUIRE, DB_QUERY, record_timing
+
+_UNBOUNDED_LIMITER = AcquireLimiter()
+
+DEFAULT_ROUTE_CLASS = "default"
+
+
+def _circuit_open(exc: CircuitOpenError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Database is temporarily unavailable",
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+def _saturated(exc: PoolSaturatedError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Database connection pool is saturated",
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+def get_tenant_key(request: Request) -> str | None:
+    tenant = request.path_params.get("tenant")
+    if tenant is None:
+        header = getattr(request.app.state, "tenant_header", None)
+        if header is not None:
+            tenant = request.headers.get(header)
+    return tenant or None
+
+
+async def _get_tenant_pool(tenants: TenantPoolManager, tenant: str) -> asyncpg.pool.Pool:
+    try:
+        return await tenants.get_pool(tenant)
+    except UnknownTenantError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Unknown tenant",
+        ) from exc
+    except PoolSaturatedError as exc:
+        raise _saturated(exc) from exc
+    except (asyncpg.PostgresError, OSError) as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Tenant database is unavailable",
+        ) from exc
+
 
 async def get_pg_pool(request: Request) -> asyncpg.pool.Pool:
+    tenants: TenantPoolManager | None = getattr(request.app.state, "pg_tenants", None)
+    if tenants is not None:
+        tenant = get_tenant_key(request)
+        if tenant is not None:
+            return await _get_tenant_pool(tenants, tenant)
     pool = getattr(request.app.state, "pg_pool", None)
     if pool is None:
         raise HTTPException(
@@ -17,15 +78,250 @@ async def get_pg_pool(request: Request) -> asyncpg.pool.Pool:
     return pool
 
 
+def route_class(name: str) -> Callable[[Request], None]:
+    """Dependency that puts a route into a bulkhead class, e.g. ``"fast"`` or ``"heavy"``."""
+
+    def set_route_class(request: Request) -> None:
+        request.state.route_class = name
+
+    return set_route_class
+
+
+def get_route_class(request: Request) -> str:
+    return getattr(request.state, "route_class", DEFAULT_ROUTE_CLASS)
+
+
+@asynccontextmanager
+async def _hold_bulkhead(request: Request) -> AsyncIterator[None]:
+    bulkheads: Bulkheads | None = getattr(request.app.state, "pg_bulkheads", None)
+    if bulkheads is None:
+        yield
+        return
+    async with bulkheads.hold(get_route_class(request)):
+        yield
+
+
+def _get_acquire_limiter(request: Request) -> AcquireLimiter:
+    return getattr(request.app.state, "pg_acquire_limiter", None) or _UNBOUNDED_LIMITER
+
+
+@asynccontextmanager
+async def _guard_database(request: Request) -> AsyncIterator[None]:
+    breaker: CircuitBreaker | None = getattr(request.app.state, "pg_breaker", None)
+    if breaker is None:
+        yield
+        return
+    breaker.before_call()
+    try:
+        yield
+    except DATABASE_FAILURE_ERRORS:
+        breaker.record_failure()
+        raise
+    except BaseException:
+        breaker.record_neutral()
+        raise
+    else:
+        breaker.record_success()
+
+
+def _observe_acquire(request: Request, pool_label: str, started: float) -> None:
+    elapsed = time.perf_counter() - started
+    record_timing(DB_ACQUIRE, elapsed)
+    metrics = getattr(request.app.state, "metrics", None)
+    if metrics is not None:
+        metrics.acquire_seconds.labels(pool_label).observe(elapsed)
+
+
+@asynccontextmanager
+async def acquire_pg_connection(
+    request: Request,
+    pool: asyncpg.pool.Pool,
+) -> AsyncIterator[asyncpg.connection.Connection]:
+    limiter = _get_acquire_limiter(request)
+    primary = getattr(request.app.state, "pg_pool", None)
+    pool_label = "primary" if pool is primary else "tenant"
+    # Tenant pools are separate databases: bulkheads only partition the shared pools.
+    bulkhead = _hold_bulkhead(request) if pool_label == "primary" else nullcontext()
+    started = time.perf_counter()
+    try:
+        async with _guard_database(request), bulkhead:
+            connection = await limiter.acquire(pool)
+            _observe_acquire(request, pool_label, started)
+            try:
+                yield connection
+            finally:
+                await limiter.release(pool, connection)
+    except CircuitOpenError as exc:
+        raise _circuit_open(exc) from exc
+    except PoolSaturatedError as exc:
+        raise _saturated(exc) from exc
+    except asyncpg.PostgresError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to acquire database connection",
+        ) from exc
+
+
 async def get_pg_connection(
+    request: Request,
     pool: asyncpg.pool.Pool = Depends(get_pg_pool),
 ) -> AsyncIterator[asyncpg.connection.Connection]:
+    async with acquire_pg_connection(request, pool) as connection:
+        yield connection
+
+
+async def get_pg_read_router(request: Request) -> ReadPoolRouter:
+    router = getattr(request.app.state, "pg_read_router", None)
+    if router is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database connection pool is not initialized",
+        )
+    return router
+
+
+@asynccontextmanager
+async def acquire_pg_read_connection(
+    request: Request,
+    router: ReadPoolRouter,
+) -> AsyncIterator[asyncpg.connection.Connection]:
+    started = time.perf_counter()
     try:
-        async with pool.acquire() as connection:
+        async with (
+            _guard_database(request),
+            _hold_bulkhead(request),
+            router.acquire() as connection,
+        ):
+            _observe_acquire(request, "read", started)
             yield connection
+    except CircuitOpenError as exc:
+        raise _circuit_open(exc) from exc
+    except PoolSaturatedError as exc:
+        raise _saturated(exc) from exc
     except asyncpg.PostgresError as exc:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to acquire database connection",
         ) from exc
 
+
+@asynccontextmanager
+async def acquire_request_read_connection(
+    request: Request,
+) -> AsyncIterator[asyncpg.connection.Connection]:
+    """Read connection for the request's tenant, or from the read router without one."""
+    tenants: TenantPoolManager | None = getattr(request.app.state, "pg_tenants", None)
+    tenant = get_tenant_key(request) if tenants is not None else None
+    if tenants is not None and tenant is not None:
+        # Tenant databases have no replicas: reads go to the tenant's own pool.
+        pool = await _get_tenant_pool(tenants, tenant)
+        async with acquire_pg_connection(request, pool) as connection:
+            yield connection
+        return
+    router = await get_pg_read_router(request)
+    async with acquire_pg_read_connection(request, router) as connection:
+        yield connection
+
+
+async def get_pg_read_connection(
+    request: Request,
+) -> AsyncIterator[asyncpg.connection.Connection]:
+    async with acquire_request_read_connection(request) as connection:
+        yield connection
+
+
+class LazyPgConnection:
+    """Connection handle that acquires from the pool on the first query.
+
+    The connection is returned to the pool by ``release()`` or, at the latest,
+    when the request's dependencies are torn down before the response is sent.
+    """
+
+    def __init__(self, request: Request, *, read_only: bool = False) -> None:
+        self._request = request
+        self._read_only = read_only
+        self._stack: AsyncExitStack | None = None
+        self._connection: asyncpg.connection.Connection | None = None
+
+    @property
+    def acquired(self) -> bool:
+        return self._connection is not None
+
+    async def connection(self) -> asyncpg.connection.Connection:
+        if self._connection is None:
+            stack = AsyncExitStack()
+            if self._read_only:
+                context = acquire_request_read_connection(self._request)
+            else:
+                pool = await get_pg_pool(self._request)
+                context = acquire_pg_connection(self._request, pool)
+            self._connection = await stack.enter_async_context(context)
+            self._stack = stack
+        return self._connection
+
+    async def release(self, exc: BaseException | None = None) -> None:
+        """Return the connection; ``exc`` is the error the request is failing with, if any."""
+        stack, self._stack, self._connection = self._stack, None, None
+        if stack is None:
+            return
+        if exc is None:
+            await stack.aclose()
+        else:
+            # The circuit breaker classifies the error; a plain close would count as a success.
+            await stack.__aexit__(type(exc), exc, exc.__traceback__)
+
+    async def execute(self, query: str, *args: Any, timeout: float | None = None) -> str:
+        return await self._run("execute", query, args, timeout)
+
+    async def fetch(self, query: str, *args: Any, timeout: float | None = None) -> list[Any]:
+        return await self._run("fetch", query, args, timeout)
+
+    async def fetchrow(self, query: str, *args: Any, timeout: float | None = None) -> Any:
+        return await self._run("fetchrow", query, args, timeout)
+
+    async def fetchval(self, query: str, *args: Any, timeout: float | None = None) -> Any:
+        return await self._run("fetchval", query, args, timeout)
+
+    async def _run(
+        self,
+        method: str,
+        query: str,
+        args: tuple[Any, ...],
+        timeout: float | None,
+    ) -> Any:
+        connection = await self.connection()
+        started = time.perf_counter()
+        try:
+            return await getattr(connection, method)(query, *args, timeout=timeout)
+        finally:
+            record_timing(DB_QUERY, time.perf_counter() - started)
+
+
+async def get_lazy_pg_connection(request: Request) -> AsyncIterator[LazyPgConnection]:
+    connection = LazyPgConnection(request)
+    try:
+        yield connection
+    except BaseException as exc:
+        await connection.release(exc)
+        raise
+    await connection.release()
+
+
+async def get_lazy_pg_read_connection(request: Request) -> AsyncIterator[LazyPgConnection]:
+    connection = LazyPgConnection(request, read_only=True)
+    try:
+        yield connection
+    except BaseException as exc:
+        await connection.release(exc)
+        raise
+    await connection.release()
+
+
+async def get_db_version_cache(request: Request) -> TTLCache[CachedBody]:
+    cache = getattr(request.app.state, "db_version_cache", None)
+    if cache is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database version cache is not initialized",
+        )
+    return cache
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import csv
+import io
+import logging
+from collections.abc import AsyncIterator, Callable, Sequence
+from typing import Literal
+
+import asyncpg
+from fastapi import HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+
+from .dependencies import acquire_request_read_connection
+from .responses import dumps_json_lenient
+from .statements import StatementRegistry
+
+logger = logging.getLogger(__name__)
+
+ExportFormat = Literal["ndjson", "csv"]
+
+MEDIA_TYPES: dict[str, str] = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def encode_ndjson(records: Sequence[asyncpg.Record], with_header: bool) -> bytes:
+    return b"".join(dumps_json_lenient(dict(record)) + b"\n" for record in records)
+
+
+def encode_csv(records: Sequence[asyncpg.Record], with_header: bool) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if with_header:
+        writer.writerow(records[0].keys())
+    writer.writerows(records)
+    return buffer.getvalue().encode("utf-8")
+
+
+ENCODERS: dict[str, Callable[[Sequence[asyncpg.Record], bool], bytes]] = {
+    "ndjson": encode_ndjson,
+    "csv": encode_csv,
+}
+
+
+async def _export_chunks(
+    request: Request,
+    name: str,
+    export_format: ExportFormat,
+    chunk_size: int,
+) -> AsyncIterator[bytes]:
+    statements: StatementRegistry = request.app.state.statements
+    encode = ENCODERS[export_format]
+    async with acquire_request_read_connection(request) as connection:
+        statement = await statements.statement(connection, name)
+        # Server-side cursors only live inside a transaction.
+        async with connection.transaction(readonly=True):
+            cursor = await statement.cursor()
+            first = True
+            while True:
+                records = await cursor.fetch(chunk_size)
+                if not records:
+                    break
+                yield encode(records, first)
+                first = False
+            if first:
+                # Announce the stream even for empty results so the caller can respond.
+                yield b""
+
+
+async def stream_export(
+    request: Request,
+    name: str,
+    export_format: ExportFormat,
+    *,
+    chunk_size: int,
+) -> StreamingResponse:
+    statements: StatementRegistry = request.app.state.statements
+    if not statements.is_exportable(name):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown export")
+
+    chunks = _export_chunks(request, name, export_format, chunk_size)
+    # Run up to the first chunk here, so acquire and query errors still become
+    # regular HTTP errors instead of a truncated 200 response.
+    try:
+        first_chunk = await anext(chunks)
+    except asyncpg.PostgresError as exc:
+        await chunks.aclose()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to run export query",
+        ) from exc
+
+    async def body() -> AsyncIterator[bytes]:
+        try:
+            if first_chunk:
+                yield first_chunk
+            async for chunk in chunks:
+                yield chunk
+        except asyncpg.PostgresError:
+            logger.exception("Export %s failed after streaming started", name)
+            raise
+        finally:
+            await chunks.aclose()
+
+    return StreamingResponse(
+        body(),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{export_format}"'},
+    )
@@ -0,0 +1,339 @@
+from __future__ import annotations
+
+import csv
+import io
+import logging
+import time
+from collections.abc import AsyncIterator, Callable, Mapping, Sequence
+from dataclasses import dataclass
+from datetime import date, datetime
+from datetime import time as time_of_day
+from typing import Any, Literal
+
+import asyncpg
+from asyncpg.transaction import Transaction
+from fastapi import HTTPException, Request, status
+
+from .dependencies import LazyPgConnection
+from .responses import JSON_DECODE_ERRORS, loads_json
+from .timing import DB_QUERY, record_timing
+
+logger = logging.getLogger(__name__)
+
+IngestFormat = Literal["ndjson", "csv"]
+
+COLUMN_TYPES_QUERY = """
+SELECT a.attname, t.typname
+FROM pg_attribute AS a
+JOIN pg_type AS t ON t.oid = a.atttypid
+WHERE a.attrelid = to_regclass(concat_ws('.', quote_ident($1::text), quote_ident($2::text)))
+  AND a.attnum > 0
+  AND NOT a.attisdropped
+"""
+
+# Binary COPY needs Python objects for these types, while JSON can only carry ISO strings.
+ISO_PARSERS: dict[str, Callable[[str], Any]] = {
+    "date": date.fromisoformat,
+    "time": time_of_day.fromisoformat,
+    "timetz": time_of_day.fromisoformat,
+    "timestamp": datetime.fromisoformat,
+    "timestamptz": datetime.fromisoformat,
+}
+
+# (position in the record, column name, parser) for columns that need ISO parsing.
+ColumnParser = tuple[int, str, Callable[[str], Any]]
+
+
+class IngestError(ValueError):
+    """Raised when an ingest body cannot be parsed into rows of the target table."""
+
+
+class RejectedValueError(ValueError):
+    """Raised when an NDJSON value cannot be converted to its column type."""
+
+
+# Errors caused by the uploaded data rather than by the database itself.
+REJECTED_DATA_ERRORS = (
+    asyncpg.DataError,
+    asyncpg.IntegrityConstraintViolationError,
+    RejectedValueError,
+)
+
+
+def is_rejected_data(exc: BaseException) -> bool:
+    if isinstance(exc, REJECTED_DATA_ERRORS):
+        return True
+    # asyncpg's client-side encode error, raised when a value does not fit its column in
+    # binary COPY, is both an InterfaceError and a ValueError.
+    return isinstance(exc, asyncpg.InterfaceError) and isinstance(exc, ValueError)
+
+
+@dataclass(frozen=True, slots=True)
+class IngestTarget:
+    table: str
+    columns: tuple[str, ...]
+    schema_name: str | None = None
+
+    @classmethod
+    def from_name(cls, name: str, columns: Sequence[str]) -> IngestTarget:
+        schema_name, _, table = name.rpartition(".")
+        return cls(table, tuple(columns), schema_name or None)
+
+
+def build_ingest_targets(tables: Mapping[str, Sequence[str]]) -> dict[str, IngestTarget]:
+    return {name: IngestTarget.from_name(name, columns) for name, columns in tables.items()}
+
+
+@dataclass(frozen=True, slots=True)
+class BatchStats:
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "rows": self.rows,
+            "seconds": round(self.seconds, 6),
+            "rows_per_second": round(self.rows_per_second, 1),
+        }
+
+
+async def iter_lines(stream: AsyncIterator[bytes], *, quoted: bool = False) -> AsyncIterator[bytes]:
+    """Split a byte stream into non-empty lines without buffering the whole body.
+
+    With ``quoted`` set, newlines inside double-quoted CSV fields do not end a line.
+    """
+    buffer = bytearray()
+    scanned = 0
+    quotes = 0
+    async for chunk in stream:
+        buffer += chunk
+        start = 0
+        while (end := buffer.find(b"\n", scanned)) != -1:
+            if quoted:
+                quotes += buffer.count(b'"', scanned, end)
+            scanned = end + 1
+            if quotes % 2:
+                continue
+            line = bytes(buffer[start:end])
+            start = scanned
+            quotes = 0
+            if line.strip():
+                yield line
+        del buffer[:start]
+        scanned -= start
+    if quoted and (quotes + buffer.count(b'"', scanned)) % 2:
+        raise IngestError("Unterminated quoted field at the end of the body")
+    if buffer.strip():
+        yield bytes(buffer)
+
+
+class BatchWriter:
+    """COPYs batches into one table inside a single transaction, timing every batch.
+
+    The connection is acquired on the first batch, so an empty body, or one
+    rejected before its first batch is complete, never takes a pool connection.
+    """
+
+    def __init__(self, connection: LazyPgConnection, target: IngestTarget) -> None:
+        self._connection = connection
+        self._target = target
+        self._transaction: Transaction | None = None
+        self._parsers: list[ColumnParser] | None = None
+        self.batches: list[BatchStats] = []
+
+    async def copy_records(self, records: list[tuple[Any, ...]]) -> None:
+        connection = await self._begin()
+        started = time.perf_counter()
+        if self._parsers is None:
+            self._parsers = await self._load_parsers(connection)
+        if self._parsers:
+            records = [_coerce_record(record, self._parsers) for record in records]
+        await connection.copy_records_to_table(
+            self._target.table,
+            records=records,
+            columns=self._target.columns,
+            schema_name=self._target.schema_name,
+        )
+        self._record(len(records), started)
+
+    async def copy_csv(self, columns: Sequence[str], payload: bytes, rows: int) -> None:
+        connection = await self._begin()
+        started = time.perf_counter()
+        await connection.copy_to_table(
+            self._target.table,
+            source=io.BytesIO(payload),
+            columns=list(columns),
+            schema_name=self._target.schema_name,
+            format="csv",
+        )
+        self._record(rows, started)
+
+    async def commit(self) -> None:
+        transaction, self._transaction = self._transaction, None
+        if transaction is not None:
+            await transaction.commit()
+
+    async def rollback(self) -> None:
+        transaction, self._transaction = self._transaction, None
+        if transaction is not None:
+            await transaction.rollback()
+
+    async def _begin(self) -> asyncpg.connection.Connection:
+        connection = await self._connection.connection()
+        if self._transaction is None:
+            self._transaction = connection.transaction()
+            await self._transaction.start()
+        return connection
+
+    async def _load_parsers(self, connection: asyncpg.connection.Connection) -> list[ColumnParser]:
+        rows = await connection.fetch(
+            COLUMN_TYPES_QUERY, self._target.schema_name, self._target.table
+        )
+        types = {row["attname"]: row["typname"] for row in rows}
+        return [
+            (index, column, ISO_PARSERS[types[column]])
+            for index, column in enumerate(self._target.columns)
+            if types.get(column) in ISO_PARSERS
+        ]
+
+    def _record(self, rows: int, started: float) -> None:
+        elapsed = time.perf_counter() - started
+        record_timing(DB_QUERY, elapsed)
+        stats = BatchStats(rows, elapsed)
+        self.batches.append(stats)
+        logger.info(
+            "Copied %d rows into %s in %.3fs (%.0f rows/s)",
+            rows,
+            self._target.table,
+            elapsed,
+            stats.rows_per_second,
+        )
+
+
+def _coerce_record(record: tuple[Any, ...], parsers: Sequence[ColumnParser]) -> tuple[Any, ...]:
+    values = list(record)
+    for index, column, parse in parsers:
+        value = values[index]
+        if isinstance(value, str):
+            try:
+                values[index] = parse(value)
+            except ValueError as exc:
+                raise RejectedValueError(f"Column {column!r}: {exc}") from exc
+    return tuple(values)
+
+
+def _parse_ndjson_record(line: bytes, number: int, target: IngestTarget) -> tuple[Any, ...]:
+    try:
+        item = loads_json(line)
+    except JSON_DECODE_ERRORS as exc:
+        raise IngestError(f"Line {number} is not valid JSON") from exc
+    if not isinstance(item, dict):
+        raise IngestError(f"Line {number} is not a JSON object")
+    unknown = item.keys() - set(target.columns)
+    if unknown:
+        raise IngestError(f"Line {number} has unknown columns: {', '.join(sorted(unknown))}")
+    # Missing keys are loaded as NULL.
+    return tuple(item.get(column) for column in target.columns)
+
+
+async def _ingest_ndjson(
+    lines: AsyncIterator[bytes],
+    writer: BatchWriter,
+    target: IngestTarget,
+    batch_size: int,
+) -> None:
+    batch: list[tuple[Any, ...]] = []
+    number = 0
+    async for line in lines:
+        number += 1
+        batch.append(_parse_ndjson_record(line, number, target))
+        if len(batch) >= batch_size:
+            await writer.copy_records(batch)
+            batch = []
+    if batch:
+        await writer.copy_records(batch)
+
+
+def _parse_csv_header(line: bytes, target: IngestTarget) -> list[str]:
+    try:
+        columns = next(csv.reader([line.decode("utf-8-sig")]))
+    except (UnicodeDecodeError, csv.Error) as exc:
+        raise IngestError("CSV header is malformed") from exc
+    unknown = set(columns) - set(target.columns)
+    if unknown:
+        raise IngestError(f"CSV header has unknown columns: {', '.join(sorted(unknown))}")
+    if len(set(columns)) != len(columns):
+        raise IngestError("CSV header has duplicate columns")
+    return columns
+
+
+async def _ingest_csv(
+    lines: AsyncIterator[bytes],
+    writer: BatchWriter,
+    target: IngestTarget,
+    batch_size: int,
+) -> None:
+    header = await anext(lines, None)
+    if header is None:
+        return
+    columns = _parse_csv_header(header, target)
+    # Rows are passed to COPY ... CSV as they are, so Postgres does the parsing.
+    batch: list[bytes] = []
+    async for line in lines:
+        batch.append(line)
+        if len(batch) >= batch_size:
+            await writer.copy_csv(columns, b"\n".join(batch) + b"\n", len(batch))
+            batch = []
+    if batch:
+        await writer.copy_csv(columns, b"\n".join(batch) + b"\n", len(batch))
+
+
+async def ingest_stream(
+    request: Request,
+    connection: LazyPgConnection,
+    name: str,
+    ingest_format: IngestFormat,
+    *,
+    batch_size: int,
+) -> dict[str, Any]:
+    targets: Mapping[str, IngestTarget] = getattr(request.app.state, "ingest_targets", {})
+    target = targets.get(name)
+    if target is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown ingest target")
+
+    writer = BatchWriter(connection, target)
+    lines = iter_lines(request.stream(), quoted=ingest_format == "csv")
+    ingest = _ingest_csv if ingest_format == "csv" else _ingest_ndjson
+    try:
+        try:
+            await ingest(lines, writer, target, batch_size)
+            await writer.commit()
+        except BaseException:
+            await writer.rollback()
+            raise
+    except IngestError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    except (asyncpg.PostgresError, asyncpg.InterfaceError, RejectedValueError) as exc:
+        if is_rejected_data(exc):
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Rows rejected by the database: {exc}",
+            ) from exc
+        if not isinstance(exc, asyncpg.PostgresError):
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to ingest rows",
+        ) from exc
+
+    rows = sum(batch.rows for batch in writer.batches)
+    seconds = sum(batch.seconds for batch in writer.batches)
+    return {
+        "target": name,
+        **BatchStats(rows, seconds).as_dict(),
+        "batches": [batch.as_dict() for batch in writer.batches],
+    }
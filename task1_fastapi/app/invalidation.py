@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+from collections.abc import Awaitable, Callable, Iterable, Mapping, Sequence
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+# Errors that mean the listener connection could not be opened or was lost.
+LISTENER_ERRORS: tuple[type[BaseException], ...] = (
+    OSError,
+    TimeoutError,
+    asyncpg.PostgresError,
+    asyncpg.InterfaceError,
+)
+
+
+class CacheInvalidator:
+    """Evicts cache keys when Postgres sends a NOTIFY on a subscribed channel.
+
+    LISTEN is bound to a session, so the invalidator keeps one dedicated connection
+    outside the pool and reconnects with exponential backoff when it drops. A
+    notification evicts the keys configured for its channel plus the key named by
+    a non-empty payload. Notifications sent while disconnected are lost, so every
+    configured key is evicted after each (re)connect.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Awaitable[asyncpg.Connection]],
+        channels: Mapping[str, Sequence[str]],
+        *,
+        reconnect_interval: float = 1.0,
+        max_reconnect_interval: float = 30.0,
+    ) -> None:
+        if reconnect_interval <= 0:
+            raise ValueError("reconnect_interval must be positive")
+        self._connect = connect
+        self._channels = {channel: tuple(keys) for channel, keys in channels.items()}
+        self._reconnect_interval = reconnect_interval
+        self._max_reconnect_interval = max(max_reconnect_interval, reconnect_interval)
+        self._evictors: list[Callable[[str], object]] = []
+        self._task: asyncio.Task[None] | None = None
+        self.connected = False
+        self.notifications: dict[str, int] = dict.fromkeys(self._channels, 0)
+
+    def add_target(self, evict: Callable[[str], object]) -> None:
+        self._evictors.append(evict)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="pg-cache-invalidator")
+
+    async def close(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+    def evict(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            for evict in self._evictors:
+                try:
+                    evict(key)
+                except Exception:
+                    logger.exception("Failed to evict cache key %r", key)
+
+    def _evict_all(self) -> None:
+        self.evict({key for keys in self._channels.values() for key in keys})
+
+    def _on_notification(
+        self,
+        connection: asyncpg.Connection,
+        pid: int,
+        channel: str,
+        payload: str,
+    ) -> None:
+        self.notifications[channel] = self.notifications.get(channel, 0) + 1
+        keys = list(self._channels.get(channel, ()))
+        if payload:
+            keys.append(payload)
+        self.evict(keys)
+
+    async def _run(self) -> None:
+        delay = self._reconnect_interval
+        while True:
+            try:
+                connection = await self._connect()
+            except LISTENER_ERRORS:
+                logger.warning(
+                    "Cache invalidation listener failed to connect, retrying in %.1fs",
+                    delay,
+                    exc_info=True,
+                )
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self._max_reconnect_interval)
+                continue
+            delay = self._reconnect_interval
+            try:
+                await self._listen(connection)
+            except LISTENER_ERRORS:
+                logger.warning("Cache invalidation listener failed", exc_info=True)
+            finally:
+                self.connected = False
+                connection.terminate()
+
+    async def _listen(self, connection: asyncpg.Connection) -> None:
+        lost = asyncio.Event()
+        connection.add_termination_listener(lambda _: lost.set())
+        for channel in self._channels:
+            await connection.add_listener(channel, self._on_notification)
+        self.connected = True
+        self._evict_all()
+        await lost.wait()
+        logger.warning("Cache invalidation listener connection lost, reconnecting")
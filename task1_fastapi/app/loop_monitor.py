@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections.abc import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class LoopMonitor:
+    """Measures event-loop scheduling lag and logs what blocked the loop.
+
+    A sampler task sleeps for ``interval`` and records how late it wakes up; the
+    delay is time the loop spent running other callbacks, so it grows with CPU-bound
+    work or blocking calls but not with slow queries, which yield while they wait.
+
+    A stalled loop cannot report on itself, so a watchdog thread checks the sampler's
+    heartbeat and, once it is ``slow_threshold`` overdue, captures the loop thread's
+    stack. When the loop resumes, the sampler logs the stall with that stack.
+    """
+
+    def __init__(
+        self,
+        *,
+        interval: float = 0.1,
+        slow_threshold: float = 0.1,
+        stack_limit: int = 30,
+        on_lag: Callable[[float], object] | None = None,
+    ) -> None:
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        if slow_threshold <= 0:
+            raise ValueError("slow_threshold must be positive")
+        self._interval = interval
+        self._slow_threshold = slow_threshold
+        self._stack_limit = stack_limit
+        self._on_lag = on_lag
+        self._task: asyncio.Task[None] | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stopped = threading.Event()
+        self._loop_thread_id = 0
+        self._heartbeat = 0.0
+        # (heartbeat, stack) written by the watchdog thread, read by the sampler.
+        self._captured: tuple[float, str] | None = None
+        self.slow_callbacks = 0
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._run(), name="event-loop-monitor")
+        self._watchdog = threading.Thread(
+            target=self._watch, name="event-loop-watchdog", daemon=True
+        )
+        self._watchdog.start()
+
+    async def close(self) -> None:
+        task, self._task = self._task, None
+        watchdog, self._watchdog = self._watchdog, None
+        self._stopped.set()
+        if task is not None:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        if watchdog is not None:
+            await asyncio.to_thread(watchdog.join)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            now = time.monotonic()
+            lag = max(0.0, now - self._heartbeat - self._interval)
+            beat, self._heartbeat = self._heartbeat, now
+            self._record(lag, beat)
+
+    def _record(self, lag: float, beat: float) -> None:
+        if self._on_lag is not None:
+            self._on_lag(lag)
+        if lag < self._slow_threshold:
+            return
+        self.slow_callbacks += 1
+        captured = self._captured
+        if captured is None or captured[0] != beat:
+            logger.warning("Event loop was blocked for %.3fs", lag)
+        else:
+            logger.warning(
+                "Event loop was blocked for %.3fs, loop thread stack:\n%s",
+                lag,
+                captured[1].rstrip(),
+            )
+
+    def _watch(self) -> None:
+        check_interval = min(self._interval, self._slow_threshold) / 2
+        while not self._stopped.wait(check_interval):
+            beat = self._heartbeat
+            overdue = time.monotonic() - beat - self._interval
+            captured = self._captured
+            if overdue < self._slow_threshold or (captured is not None and captured[0] == beat):
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = "".join(traceback.format_stack(frame, limit=self._stack_limit))
+            self._captured = (beat, stack)
@@ -1,51 +1,203 @@
 from __future__ import annotations
 
+import asyncio
 from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
+from functools import partial
 from typing import Annotated, Any
 
 import asyncpg
-import uvicorn
-from fastapi import APIRouter, Depends, FastAPI, HTTPException, status
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 
-from .dependencies import get_pg_connection
-from .settings import PostgresSettings
+from .batch import BatchRequest, run_batch
+from .breaker import CircuitBreaker
+from .cache import TTLCache
+from .conditional import CachedBody, conditional_json_response
+from .deadlines import DeadlineRoute
+from .dependencies import (
+    LazyPgConnection,
+    acquire_request_read_connection,
+    get_db_version_cache,
+    get_lazy_pg_connection,
+    get_lazy_pg_read_connection,
+    get_tenant_key,
+    route_class,
+)
+from .export import ExportFormat, stream_export
+from .ingest import IngestFormat, build_ingest_targets, ingest_stream
+from .invalidation import CacheInvalidator
+from .loop_monitor import LoopMonitor
+from .metrics import CONTENT_TYPE, AppMetrics, MetricsMiddleware
+from .pools import AcquireLimiter, Bulkheads, PoolFactory, create_pg_pool, pg_connect_kwargs
+from .responses import FastJSONResponse, encode_json
+from .server import run as run_server
+from .settings import (
+    BatchSettings,
+    CacheSettings,
+    DeadlineSettings,
+    ExportSettings,
+    IngestSettings,
+    LoopMonitorSettings,
+    PostgresSettings,
+    ServerSettings,
+    TenantSettings,
+)
+from .shm_cache import SharedMemoryCache
+from .startup import close_database, open_database, start_connecting
+from .statements import StatementRegistry
+from .tenants import TenantPoolManager
+from .timing import ServerTimingMiddleware
+from .type_codecs import CodecRegistry
+
+DB_VERSION_CACHE_KEY = "db_version"
+DB_VERSION_STATEMENT = "db_version"
+PG_SETTINGS_EXPORT = "pg_settings"
+FAST_ROUTES = "fast"
+HEAVY_ROUTES = "heavy"
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
-    settings = PostgresSettings()
-    try:
-        pool = await asyncpg.create_pool(
-            host=settings.host,
-            port=settings.port,
-            user=settings.user,
-            password=settings.password.get_secret_value(),
-            database=settings.database,
-            min_size=settings.min_size,
-            max_size=settings.max_size,
-            command_timeout=settings.command_timeout,
+    workers = ServerSettings().workers
+    settings = PostgresSettings().for_workers(workers)
+    statements: StatementRegistry = app.state.statements
+    codecs: CodecRegistry = app.state.codecs
+    if settings.json_codecs:
+        codecs.register_json()
+    if settings.numeric_as_float:
+        codecs.register_numeric_as_float()
+    if settings.uuid_as_text:
+        codecs.register_uuid_as_text()
+    limiter = AcquireLimiter(
+        timeout=settings.acquire_timeout,
+        max_waiters=settings.max_waiters,
+        retry_after=settings.retry_after,
+    )
+    metrics: AppMetrics = app.state.metrics
+    metrics.track_limiter(limiter)
+    app.state.pg_acquire_limiter = limiter
+    # Called by server.DrainingServer as soon as shutdown starts, before uvicorn waits
+    # for in-flight requests; the lifespan shutdown below reuses the same grace period.
+    app.state.begin_shutdown = partial(limiter.drain, settings.shutdown_grace)
+    if settings.breaker_failure_threshold:
+        breaker = CircuitBreaker(
+            failure_threshold=settings.breaker_failure_threshold,
+            reset_timeout=settings.breaker_reset_timeout,
+            half_open_max_calls=settings.breaker_half_open_calls,
+        )
+        metrics.track_breaker(breaker)
+        app.state.pg_breaker = breaker
+    if settings.bulkheads:
+        bulkheads = Bulkheads(
+            settings.bulkheads,
+            timeout=settings.acquire_timeout,
+            retry_after=settings.retry_after,
         )
-    except asyncpg.PostgresError as exc:
-        raise RuntimeError("Failed to initialize PostgreSQL connection pool") from exc
+        metrics.track_bulkheads(bulkheads)
+        app.state.pg_bulkheads = bulkheads
+    # Until the pool is published, database routes answer 503 and /readyz reports "starting".
+    app.state.pg_pool = None
+    app.state.pg_read_router = None
+    cache_settings = CacheSettings()
+    app.state.cache_settings = cache_settings
+    app.state.db_version_cache = TTLCache(cache_settings.db_version_ttl)
+    app.state.export_settings = ExportSettings()
+    app.state.batch_settings = BatchSettings()
+    ingest_settings = IngestSettings()
+    app.state.ingest_settings = ingest_settings
+    app.state.ingest_targets = build_ingest_targets(ingest_settings.tables)
+    tenant_settings = TenantSettings().for_workers(workers)
+    loop_settings = LoopMonitorSettings()
 
-    app.state.pg_pool = pool
+    connecting = None
+    shared_cache = None
+    invalidator = None
+    tenants = None
+    loop_monitor = None
+    # Setup shares the shutdown path below, so a failure part-way through startup
+    # closes the pools and tasks that were already opened instead of leaking them.
     try:
+        if settings.connect_in_background:
+            connecting = start_connecting(app, settings)
+        else:
+            try:
+                await open_database(app, settings)
+            except asyncpg.PostgresError as exc:
+                raise RuntimeError("Failed to initialize PostgreSQL connection pool") from exc
+
+        if cache_settings.shared_path:
+            shared_cache = SharedMemoryCache(
+                cache_settings.shared_path,
+                slots=cache_settings.shared_slots,
+                slot_size=cache_settings.shared_slot_size,
+            )
+        app.state.shared_cache = shared_cache
+        if cache_settings.invalidation_channels:
+            invalidator = CacheInvalidator(
+                lambda: asyncpg.connect(**pg_connect_kwargs(settings)),
+                cache_settings.invalidation_channels,
+                reconnect_interval=cache_settings.invalidation_reconnect_interval,
+            )
+            invalidator.add_target(app.state.db_version_cache.invalidate)
+            if shared_cache is not None:
+                invalidator.add_target(shared_cache.delete)
+            invalidator.start()
+            metrics.track_invalidator(invalidator)
+        app.state.cache_invalidator = invalidator
+
+        if tenant_settings.dsns:
+            tenants = TenantPoolManager(
+                tenant_settings.dsns,
+                settings,
+                statements,
+                codecs=codecs,
+                pool_max_size=tenant_settings.pool_max_size,
+                max_connections=tenant_settings.max_connections,
+                idle_timeout=tenant_settings.idle_timeout,
+                retry_after=settings.retry_after,
+            )
+            tenants.start()
+            metrics.track_tenants(tenants)
+            app.state.tenant_header = tenant_settings.header
+        app.state.pg_tenants = tenants
+        if loop_settings.enabled:
+            loop_monitor = LoopMonitor(
+                interval=loop_settings.interval,
+                slow_threshold=loop_settings.slow_threshold,
+                on_lag=metrics.loop_lag.labels().observe,
+            )
+            loop_monitor.start()
+            metrics.track_loop_monitor(loop_monitor)
+        app.state.loop_monitor = loop_monitor
         yield
     finally:
-        await pool.close()
+        drain = await limiter.drain(settings.shutdown_grace)
+        if tenants is not None:
+            await tenants.close(terminate=drain.aborted > 0)
+        if invalidator is not None:
+            await invalidator.close()
+        if shared_cache is not None:
+            shared_cache.close()
+        if connecting is not None:
+            connecting.cancel()
+            # A connect task that failed was already logged by its done callback.
+            await asyncio.gather(connecting, return_exceptions=True)
+        await close_database(app, terminate=drain.aborted > 0)
+        if loop_monitor is not None:
+            await loop_monitor.close()
 
 
-async def get_db_version(
-    connection: Annotated[asyncpg.Connection, Depends(get_pg_connection)],
-) -> dict[str, Any]:
-    try:
-        record = await connection.fetchrow("SELECT version() AS version")
-    except asyncpg.PostgresError as exc:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to fetch database version",
-        ) from exc
+async def fetch_db_version(request: Request) -> dict[str, Any]:
+    statements: StatementRegistry = request.app.state.statements
+    async with acquire_request_read_connection(request) as connection:
+        try:
+            record = await statements.fetchrow(connection, DB_VERSION_STATEMENT)
+        except asyncpg.PostgresError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to fetch database version",
+            ) from exc
     if record is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -54,19 +206,190 @@ async def get_db_version(
     return {"version": record["version"]}
 
 
+def db_version_cache_key(request: Request) -> str:
+    # Tenants are separate databases, so each one gets its own cache entry.
+    tenant = get_tenant_key(request)
+    return DB_VERSION_CACHE_KEY if tenant is None else f"{DB_VERSION_CACHE_KEY}:{tenant}"
+
+
+async def load_db_version(
+    request: Request,
+    cache: TTLCache[CachedBody],
+    key: str,
+) -> CachedBody:
+    shared_cache: SharedMemoryCache | None = getattr(request.app.state, "shared_cache", None)
+    if shared_cache is not None:
+        body = shared_cache.get(key)
+        if body is not None:
+            return CachedBody.from_body(body)
+
+    generation = cache.generation
+    cached = CachedBody.from_body(encode_json(await fetch_db_version(request)))
+    # A NOTIFY during the query means the result may predate the change: other workers
+    # must not pick it up from shared memory.
+    if shared_cache is not None and cache.generation == generation:
+        cache_settings: CacheSettings = request.app.state.cache_settings
+        shared_cache.set(key, cached.body, cache_settings.db_version_ttl)
+    return cached
+
+
+async def get_db_version(
+    request: Request,
+    cache: Annotated[TTLCache[CachedBody], Depends(get_db_version_cache)],
+) -> Response:
+    key = db_version_cache_key(request)
+    cached = await cache.get_or_load(key, lambda: load_db_version(request, cache, key))
+    cache_settings: CacheSettings = request.app.state.cache_settings
+    return conditional_json_response(request, cached, max_age=cache_settings.db_version_max_age)
+
+
+async def export_query(
+    request: Request,
+    name: str,
+    export_format: Annotated[ExportFormat, Query(alias="format")] = "ndjson",
+) -> StreamingResponse:
+    export_settings: ExportSettings = request.app.state.export_settings
+    return await stream_export(request, name, export_format, chunk_size=export_settings.chunk_size)
+
+
+async def ingest_table(
+    request: Request,
+    name: str,
+    connection: Annotated[LazyPgConnection, Depends(get_lazy_pg_connection)],
+    ingest_format: Annotated[IngestFormat, Query(alias="format")] = "ndjson",
+) -> dict[str, Any]:
+    ingest_settings: IngestSettings = request.app.state.ingest_settings
+    return await ingest_stream(
+        request,
+        connection,
+        name,
+        ingest_format,
+        batch_size=ingest_settings.batch_size,
+    )
+
+
+async def batch_queries(
+    request: Request,
+    batch: BatchRequest,
+    connection: Annotated[LazyPgConnection, Depends(get_lazy_pg_read_connection)],
+) -> Response:
+    batch_settings: BatchSettings = request.app.state.batch_settings
+    return await run_batch(request, connection, batch, max_queries=batch_settings.max_queries)
+
+
+async def get_healthz() -> dict[str, str]:
+    return {"status": "ok"}
+
+
+async def get_readyz(request: Request) -> Response:
+    limiter: AcquireLimiter | None = getattr(request.app.state, "pg_acquire_limiter", None)
+    if limiter is not None and limiter.draining:
+        return FastJSONResponse(
+            {"status": "draining"},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
+    pool: asyncpg.pool.Pool | None = getattr(request.app.state, "pg_pool", None)
+    if pool is None:
+        failed = getattr(request.app.state, "pg_connect_failed", False)
+        return FastJSONResponse(
+            {"status": "failed" if failed else "starting"},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
+    return FastJSONResponse(
+        {"status": "ready", "pool_size": pool.get_size(), "pool_idle": pool.get_idle_size()}
+    )
+
+
+async def get_metrics(request: Request) -> Response:
+    metrics: AppMetrics = request.app.state.metrics
+    return Response(content=metrics.render(), media_type=CONTENT_TYPE)
+
+
 def register_routes(app: FastAPI) -> None:
-    router = APIRouter(prefix="/api")
+    app.state.statements.register(
+        DB_VERSION_STATEMENT,
+        "SELECT version() AS version",
+        batchable=True,
+    )
+    app.state.statements.register(
+        PG_SETTINGS_EXPORT,
+        "SELECT name, setting, unit, category FROM pg_settings ORDER BY name",
+        exportable=True,
+        batchable=True,
+    )
+
+    router = APIRouter(prefix="/api", route_class=DeadlineRoute)
     router.add_api_route(
         path="/db_version",
         endpoint=get_db_version,
         methods=["GET"],
         name="db_version",
+        dependencies=[Depends(route_class(FAST_ROUTES))],
+    )
+    router.add_api_route(
+        path="/export/{name}",
+        endpoint=export_query,
+        methods=["GET"],
+        name="export_query",
+        dependencies=[Depends(route_class(HEAVY_ROUTES))],
+        response_class=StreamingResponse,
+    )
+    router.add_api_route(
+        path="/ingest/{name}",
+        endpoint=ingest_table,
+        methods=["POST"],
+        name="ingest_table",
+        dependencies=[Depends(route_class(HEAVY_ROUTES))],
+    )
+    router.add_api_route(
+        path="/batch",
+        endpoint=batch_queries,
+        methods=["POST"],
+        name="batch_queries",
+        dependencies=[Depends(route_class(HEAVY_ROUTES))],
     )
     app.include_router(router)
+    app.add_api_route(
+        path="/healthz",
+        endpoint=get_healthz,
+        methods=["GET"],
+        name="healthz",
+        include_in_schema=False,
+    )
+    app.add_api_route(
+        path="/readyz",
+        endpoint=get_readyz,
+        methods=["GET"],
+        name="readyz",
+        include_in_schema=False,
+    )
+    app.add_api_route(
+        path="/metrics",
+        endpoint=get_metrics,
+        methods=["GET"],
+        name="metrics",
+        include_in_schema=False,
+    )
 
 
-def create_app() -> FastAPI:
-    app = FastAPI(title="e-Comet", lifespan=lifespan)
+def create_app(
+    *,
+    response_class: type[Response] = FastJSONResponse,
+    pool_factory: PoolFactory = create_pg_pool,
+) -> FastAPI:
+    app = FastAPI(title="e-Comet", lifespan=lifespan, default_response_class=response_class)
+    app.state.pg_pool_factory = pool_factory
+    app.state.metrics = AppMetrics()
+    app.state.statements = StatementRegistry(app.state.metrics)
+    app.state.codecs = CodecRegistry()
+    app.state.deadlines = DeadlineSettings()
+    app.add_middleware(MetricsMiddleware, metrics=app.state.metrics)
+    server_settings = ServerSettings()
+    app.add_middleware(
+        ServerTimingMiddleware,
+        header=server_settings.timing_header,
+        log=server_settings.timing_log,
+    )
     register_routes(app)
     return app
 
@@ -75,5 +398,5 @@ app = create_app()
 
 
 if __name__ == "__main__":
-    uvicorn.run("task1_fastapi.app.main:create_app", factory=True)
+    run_server()
 
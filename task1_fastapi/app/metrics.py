@@ -0,0 +1,378 @@
+from __future__ import annotations
+
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterator, Sequence
+from typing import TYPE_CHECKING, Any
+
+import asyncpg
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+if TYPE_CHECKING:
+    from .breaker import CircuitBreaker
+    from .invalidation import CacheInvalidator
+    from .loop_monitor import LoopMonitor
+    from .pools import AcquireLimiter, Bulkheads, PoolCapacity
+    from .statements import StatementRegistry
+    from .tenants import TenantPoolManager
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS: tuple[float, ...] = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], Any] = {}
+
+    def labels(self, *values: str) -> Any:
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def set_function(self, function: Callable[[], float], *values: str) -> None:
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        self._children[values] = _CallbackChild(function)
+
+    def remove(self, *values: str) -> None:
+        self._children.pop(values, None)
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        yield from self.samples()
+
+
+class _CallbackChild:
+    __slots__ = ("_function",)
+
+    def __init__(self, function: Callable[[], float]) -> None:
+        self._function = function
+
+    @property
+    def value(self) -> float:
+        return self._function()
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def samples(self) -> Iterator[str]:
+        for values, child in list(self._children.items()):
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_total{labels} {_format_value(child.value)}"
+
+
+class Gauge(_Metric):
+    """Gauge whose value is read from a callback at scrape time."""
+
+    kind = "gauge"
+
+    def _new_child(self) -> Any:
+        raise TypeError("Gauge values are provided with set_function()")
+
+    def samples(self) -> Iterator[str]:
+        for values, child in list(self._children.items()):
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}{labels} {_format_value(child.value)}"
+
+
+class _HistogramChild:
+    __slots__ = ("_upper_bounds", "counts", "sum")
+
+    def __init__(self, upper_bounds: tuple[float, ...]) -> None:
+        self._upper_bounds = upper_bounds
+        # One slot per bucket plus +Inf; counts are cumulated only when rendering.
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self._upper_bounds, value)] += 1
+        self.sum += value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        *,
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def samples(self) -> Iterator[str]:
+        bounds = (*self.buckets, float("inf"))
+        for values, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip(bounds, child.counts, strict=True):
+                cumulative += count
+                labels = _format_labels(self.labelnames, values, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_sum{labels} {_format_value(child.sum)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+
+    def register[M: _Metric](self, metric: M) -> M:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name!r} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = [line for metric in self._metrics.values() for line in metric.render()]
+        lines.append("")
+        return "\n".join(lines)
+
+
+class AppMetrics:
+    """Metric families exported by the API on ``/metrics``."""
+
+    def __init__(self) -> None:
+        self.registry = registry = MetricsRegistry()
+        self.pool_size = registry.register(
+            Gauge("pg_pool_size", "Open connections in the pool", ["pool"])
+        )
+        self.pool_max_size = registry.register(
+            Gauge("pg_pool_max_size", "Configured maximum pool size", ["pool"])
+        )
+        self.pool_idle = registry.register(
+            Gauge("pg_pool_idle_connections", "Idle connections in the pool", ["pool"])
+        )
+        self.pool_in_use = registry.register(
+            Gauge("pg_pool_in_use_connections", "Connections checked out of the pool", ["pool"])
+        )
+        self.pool_effective_size = registry.register(
+            Gauge("pg_pool_effective_size", "Connections the autoscaler allows", ["pool"])
+        )
+        self.acquire_seconds = registry.register(
+            Histogram("pg_pool_acquire_seconds", "Time spent waiting in pool.acquire()", ["pool"])
+        )
+        self.acquire_waiters = registry.register(
+            Gauge("pg_pool_acquire_waiters", "Requests waiting for a pooled connection")
+        )
+        self.acquire_rejections = registry.register(
+            Counter("pg_pool_acquire_rejections", "Acquires shed by the limiter", ["reason"])
+        )
+        self.bulkhead_limit = registry.register(
+            Gauge("pg_bulkhead_limit", "Connections a route class may hold", ["route_class"])
+        )
+        self.bulkhead_in_use = registry.register(
+            Gauge("pg_bulkhead_in_use", "Connections held by a route class", ["route_class"])
+        )
+        self.bulkhead_queued = registry.register(
+            Gauge("pg_bulkhead_queued", "Requests waiting for their class quota", ["route_class"])
+        )
+        self.breaker_state = registry.register(
+            Gauge("pg_circuit_breaker_state", "1 for the current circuit breaker state", ["state"])
+        )
+        self.breaker_opened = registry.register(
+            Counter("pg_circuit_breaker_opened", "Times the circuit breaker opened")
+        )
+        self.breaker_rejections = registry.register(
+            Counter("pg_circuit_breaker_rejections", "Requests failed fast by the breaker")
+        )
+        self.tenant_pools = registry.register(
+            Gauge("pg_tenant_pools", "Open per-tenant connection pools")
+        )
+        self.tenant_reserved = registry.register(
+            Gauge("pg_tenant_reserved_connections", "Connection budget held by tenant pools")
+        )
+        self.tenant_evictions = registry.register(
+            Counter("pg_tenant_pool_evictions", "Tenant pools closed to free budget or idle")
+        )
+        self.cache_notifications = registry.register(
+            Counter("cache_invalidation_notifications", "NOTIFY messages received", ["channel"])
+        )
+        self.cache_listener_connected = registry.register(
+            Gauge("cache_invalidation_listener_connected", "1 while the LISTEN connection is up")
+        )
+        self.query_seconds = registry.register(
+            Histogram("pg_query_duration_seconds", "Named statement latency", ["statement"])
+        )
+        self.query_errors = registry.register(
+            Counter("pg_query_errors", "Named statements that raised an error", ["statement"])
+        )
+        self.statement_cache = registry.register(
+            Counter(
+                "pg_prepared_statement_lookups",
+                "Named statement lookups by result",
+                ["result"],
+            )
+        )
+        self.loop_lag = registry.register(
+            Histogram("event_loop_lag_seconds", "How late the event loop ran a scheduled wakeup")
+        )
+        self.loop_slow_callbacks = registry.register(
+            Counter("event_loop_slow_callbacks", "Event loop stalls over the slow threshold")
+        )
+        self.request_seconds = registry.register(
+            Histogram("http_request_duration_seconds", "HTTP request latency", ["route"])
+        )
+        self.request_errors = registry.register(
+            Counter("http_request_errors", "HTTP requests answered with 5xx", ["route"])
+        )
+        self.requests_cancelled = registry.register(
+            Counter(
+                "http_requests_cancelled",
+                "Requests cancelled on deadline or client disconnect",
+                ["route", "reason"],
+            )
+        )
+
+    def track_pool(self, name: str, pool: asyncpg.pool.Pool) -> None:
+        self.pool_size.set_function(pool.get_size, name)
+        self.pool_max_size.set_function(pool.get_max_size, name)
+        self.pool_idle.set_function(pool.get_idle_size, name)
+        self.pool_in_use.set_function(lambda: pool.get_size() - pool.get_idle_size(), name)
+
+    def track_capacity(self, name: str, capacity: PoolCapacity) -> None:
+        self.pool_effective_size.set_function(lambda: capacity.limit, name)
+
+    def track_limiter(self, limiter: AcquireLimiter) -> None:
+        self.acquire_waiters.set_function(lambda: limiter.waiters)
+        self.acquire_rejections.set_function(lambda: limiter.rejected_queue_full, "queue_full")
+        self.acquire_rejections.set_function(lambda: limiter.rejected_timeout, "timeout")
+        self.acquire_rejections.set_function(lambda: limiter.rejected_draining, "draining")
+
+    def track_bulkheads(self, bulkheads: Bulkheads) -> None:
+        for name, capacity in bulkheads.capacities.items():
+            self.bulkhead_limit.set_function(lambda capacity=capacity: capacity.limit, name)
+            self.bulkhead_in_use.set_function(lambda capacity=capacity: capacity.in_use, name)
+            self.bulkhead_queued.set_function(lambda capacity=capacity: capacity.queued, name)
+            self.acquire_rejections.set_function(
+                lambda name=name: bulkheads.rejected[name], f"bulkhead_{name}"
+            )
+
+    def track_breaker(self, breaker: CircuitBreaker) -> None:
+        for state in ("closed", "open", "half_open"):
+            self.breaker_state.set_function(
+                lambda state=state: 1 if breaker.state == state else 0, state
+            )
+        self.breaker_opened.set_function(lambda: breaker.times_opened)
+        self.breaker_rejections.set_function(lambda: breaker.rejected)
+
+    def track_tenants(self, tenants: TenantPoolManager) -> None:
+        self.tenant_pools.set_function(lambda: tenants.pool_count)
+        self.tenant_reserved.set_function(lambda: tenants.reserved)
+        self.tenant_evictions.set_function(lambda: tenants.evictions)
+
+    def track_invalidator(self, invalidator: CacheInvalidator) -> None:
+        self.cache_listener_connected.set_function(lambda: 1 if invalidator.connected else 0)
+        for channel in invalidator.notifications:
+            self.cache_notifications.set_function(
+                lambda channel=channel: invalidator.notifications[channel], channel
+            )
+
+    def track_loop_monitor(self, monitor: LoopMonitor) -> None:
+        self.loop_slow_callbacks.set_function(lambda: monitor.slow_callbacks)
+
+    def track_statements(self, statements: StatementRegistry) -> None:
+        self.statement_cache.set_function(lambda: statements.hits, "hit")
+        self.statement_cache.set_function(lambda: statements.misses, "miss")
+
+    def render(self) -> str:
+        return self.registry.render()
+
+
+class MetricsMiddleware:
+    """Records latency and 5xx responses per matched route template."""
+
+    def __init__(self, app: ASGIApp, metrics: AppMetrics) -> None:
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            label = getattr(route, "path", "unmatched")
+            self.metrics.request_seconds.labels(label).observe(time.perf_counter() - started)
+            if status_code >= 500:
+                self.metrics.request_errors.labels(label).inc()
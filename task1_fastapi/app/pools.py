@@ -0,0 +1,484 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable, Mapping, Sequence
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, Literal
+
+import asyncpg
+
+from .settings import PostgresSettings
+from .statements import StatementConnection, StatementRegistry
+from .type_codecs import CodecRegistry
+
+logger = logging.getLogger(__name__)
+
+ReadBalancing = Literal["least_outstanding", "round_robin"]
+
+# Errors that mean the replica itself is unreachable, as opposed to a failing query.
+REPLICA_UNAVAILABLE_ERRORS: tuple[type[BaseException], ...] = (
+    OSError,
+    asyncpg.InterfaceError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.CannotConnectNowError,
+)
+
+
+# Signature of create_pg_pool; the benchmark harness substitutes a fake pool through it.
+PoolFactory = Callable[..., Awaitable[asyncpg.pool.Pool]]
+
+
+def pg_connect_kwargs(settings: PostgresSettings, *, dsn: str | None = None) -> dict[str, Any]:
+    if dsn is not None:
+        return {"dsn": dsn}
+    return {
+        "host": settings.host,
+        "port": settings.port,
+        "user": settings.user,
+        "password": settings.password.get_secret_value(),
+        "database": settings.database,
+    }
+
+
+async def create_pg_pool(
+    settings: PostgresSettings,
+    statements: StatementRegistry,
+    *,
+    dsn: str | None = None,
+    codecs: CodecRegistry | None = None,
+    **overrides: Any,
+) -> asyncpg.pool.Pool:
+    connect_kwargs = pg_connect_kwargs(settings, dsn=dsn)
+
+    async def init_connection(connection: asyncpg.Connection) -> None:
+        # Codecs first: setting one drops the statements prepared on the connection.
+        if codecs is not None:
+            await codecs.apply(connection)
+        await statements.prepare_connection(connection)
+
+    options: dict[str, Any] = {
+        "min_size": settings.min_size,
+        "max_size": settings.max_size,
+        "command_timeout": settings.command_timeout,
+        "max_inactive_connection_lifetime": settings.max_inactive_lifetime,
+        "connection_class": StatementConnection,
+        "init": init_connection,
+    }
+    options.update(overrides)
+    return await asyncpg.create_pool(**connect_kwargs, **options)
+
+
+async def create_replica_pools(
+    settings: PostgresSettings,
+    statements: StatementRegistry,
+    *,
+    codecs: CodecRegistry | None = None,
+) -> list[asyncpg.pool.Pool | None]:
+    """Open one pool per replica DSN; ``None`` marks a replica that was unreachable."""
+    pools: list[asyncpg.pool.Pool | None] = []
+    for index, dsn in enumerate(settings.replica_dsns):
+        try:
+            pools.append(await create_pg_pool(settings, statements, dsn=dsn, codecs=codecs))
+        except (asyncpg.PostgresError, *REPLICA_UNAVAILABLE_ERRORS):
+            # Reads fall back to the primary, so an unreachable replica must not block startup.
+            logger.warning("PostgreSQL replica #%d is unreachable", index, exc_info=True)
+            pools.append(None)
+    return pools
+
+
+class PoolSaturatedError(Exception):
+    """Raised when an acquire is shed instead of waiting for a free connection."""
+
+    def __init__(self, reason: str, retry_after: int) -> None:
+        super().__init__(f"Connection pool is saturated ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class PoolCapacity:
+    """Adjustable cap on connections checked out of one pool.
+
+    Lets the effective pool size move below the pool's ``max_size`` at runtime and
+    keeps the wait/utilization statistics the autoscaler works from.
+    """
+
+    def __init__(self, limit: int) -> None:
+        if limit <= 0:
+            raise ValueError("limit must be positive")
+        self.limit = limit
+        self.in_use = 0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+        self.window_peak = 0
+        self.window_waits = 0
+        self.window_wait_sum = 0.0
+
+    async def acquire(self) -> None:
+        if self.in_use < self.limit and not self._waiters:
+            self._take()
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just before cancellation: pass it on.
+                self.release()
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self) -> None:
+        self.in_use -= 1
+        self._wake()
+
+    def resize(self, limit: int) -> None:
+        if limit <= 0:
+            raise ValueError("limit must be positive")
+        self.limit = limit
+        self._wake()
+
+    def record_wait(self, seconds: float) -> None:
+        self.window_waits += 1
+        self.window_wait_sum += seconds
+
+    def reset_window(self) -> None:
+        self.window_peak = self.in_use
+        self.window_waits = 0
+        self.window_wait_sum = 0.0
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def _take(self) -> None:
+        self.in_use += 1
+        if self.in_use > self.window_peak:
+            self.window_peak = self.in_use
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_use < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._take()
+                waiter.set_result(None)
+
+
+def _has_free_connection(pool: asyncpg.pool.Pool, capacity: PoolCapacity | None) -> bool:
+    if capacity is not None and (capacity.in_use >= capacity.limit or capacity.queued):
+        return False
+    # A pool below max_size opens a new connection instead of waiting for one.
+    return pool.get_idle_size() > 0 or pool.get_size() < pool.get_max_size()
+
+
+@dataclass(frozen=True, slots=True)
+class DrainResult:
+    drained: int
+    aborted: int
+
+
+class AcquireLimiter:
+    """Bounds how many requests may wait for a pooled connection and for how long.
+
+    Every connection handed out through the limiter is counted until it is
+    released, which lets ``drain()`` wait for them on shutdown.
+    """
+
+    def __init__(
+        self,
+        *,
+        timeout: float | None = None,
+        max_waiters: int | None = None,
+        retry_after: int = 1,
+    ) -> None:
+        self.timeout = timeout
+        self.max_waiters = max_waiters
+        self.retry_after = retry_after
+        self.waiters = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.rejected_draining = 0
+        self.checked_out = 0
+        self.draining = False
+        self._drain_deadline: float | None = None
+        self._released_while_draining = 0
+        self._idle = asyncio.Event()
+        self._capacities: dict[asyncpg.pool.Pool, PoolCapacity] = {}
+
+    def set_capacity(self, pool: asyncpg.pool.Pool, capacity: PoolCapacity) -> None:
+        self._capacities[pool] = capacity
+
+    async def acquire(self, pool: asyncpg.pool.Pool) -> asyncpg.connection.Connection:
+        if self.draining:
+            self.rejected_draining += 1
+            raise PoolSaturatedError("draining", self.retry_after)
+        capacity = self._capacities.get(pool)
+        # Only an acquire that has to wait for a connection takes a place in the queue.
+        if (
+            self.max_waiters is not None
+            and self.waiters >= self.max_waiters
+            and not _has_free_connection(pool, capacity)
+        ):
+            self.rejected_queue_full += 1
+            raise PoolSaturatedError("queue_full", self.retry_after)
+        self.waiters += 1
+        try:
+            if capacity is None:
+                connection = await pool.acquire(timeout=self.timeout)
+            else:
+                connection = await self._acquire_with_capacity(pool, capacity)
+        except TimeoutError as exc:
+            self.rejected_timeout += 1
+            raise PoolSaturatedError("timeout", self.retry_after) from exc
+        finally:
+            self.waiters -= 1
+        self.checked_out += 1
+        return connection
+
+    async def release(
+        self,
+        pool: asyncpg.pool.Pool,
+        connection: asyncpg.connection.Connection,
+    ) -> None:
+        try:
+            await pool.release(connection)
+        finally:
+            capacity = self._capacities.get(pool)
+            if capacity is not None:
+                capacity.release()
+            self.checked_out -= 1
+            if self.draining:
+                self._released_while_draining += 1
+                if not self.checked_out:
+                    self._idle.set()
+
+    async def drain(self, grace: float) -> DrainResult:
+        """Reject new acquires and wait up to ``grace`` seconds for checked-out connections.
+
+        The grace period starts with the first call; later calls only wait for what is
+        left of it. Returns how many connections came back and how many are still
+        out; the caller terminates the pools when any are left.
+        """
+        loop = asyncio.get_running_loop()
+        if self._drain_deadline is None:
+            self.draining = True
+            self._drain_deadline = loop.time() + grace
+        remaining = self._drain_deadline - loop.time()
+        if self.checked_out and remaining > 0:
+            logger.info(
+                "Waiting up to %.1fs for %d database connections", remaining, self.checked_out
+            )
+            with contextlib.suppress(TimeoutError):
+                async with asyncio.timeout_at(self._drain_deadline):
+                    await self._idle.wait()
+        result = DrainResult(self._released_while_draining, self.checked_out)
+        logger.info(
+            "Drained %d database connections on shutdown, aborted %d",
+            result.drained,
+            result.aborted,
+        )
+        return result
+
+    async def _acquire_with_capacity(
+        self,
+        pool: asyncpg.pool.Pool,
+        capacity: PoolCapacity,
+    ) -> asyncpg.connection.Connection:
+        started = time.perf_counter()
+        async with asyncio.timeout(self.timeout):
+            await capacity.acquire()
+            try:
+                connection = await pool.acquire()
+            except BaseException:
+                capacity.release()
+                raise
+        capacity.record_wait(time.perf_counter() - started)
+        return connection
+
+
+class Bulkheads:
+    """Caps the connections each route class may hold at once.
+
+    A class with a quota can never take more than that many connections, so the
+    rest of the pool stays available to other classes; classes without a quota
+    are not limited.
+    """
+
+    def __init__(
+        self,
+        quotas: Mapping[str, int],
+        *,
+        timeout: float | None = None,
+        retry_after: int = 1,
+    ) -> None:
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.capacities = {name: PoolCapacity(limit) for name, limit in quotas.items()}
+        self.rejected: dict[str, int] = dict.fromkeys(quotas, 0)
+
+    @asynccontextmanager
+    async def hold(self, route_class: str) -> AsyncIterator[None]:
+        capacity = self.capacities.get(route_class)
+        if capacity is None:
+            yield
+            return
+        try:
+            async with asyncio.timeout(self.timeout):
+                await capacity.acquire()
+        except TimeoutError as exc:
+            self.rejected[route_class] += 1
+            raise PoolSaturatedError(f"bulkhead_{route_class}", self.retry_after) from exc
+        try:
+            yield
+        finally:
+            capacity.release()
+
+
+@dataclass(slots=True)
+class ReplicaPool:
+    # None until the replica's pool could be opened.
+    pool: asyncpg.pool.Pool | None
+    index: int = 0
+    outstanding: int = 0
+    unavailable_until: float = 0.0
+    opening: asyncio.Task[None] | None = None
+
+    def is_available(self, now: float) -> bool:
+        return self.pool is not None and self.unavailable_until <= now
+
+
+class ReadPoolRouter:
+    """Routes read-only acquires across replica pools, falling back to the primary.
+
+    A replica whose pool could not be opened (``None`` in ``replicas``) is reopened
+    in the background with ``open_replica(index)`` at most every ``retry_interval``
+    seconds; reads go to the other replicas or the primary in the meantime.
+    """
+
+    def __init__(
+        self,
+        primary: asyncpg.pool.Pool,
+        replicas: Sequence[asyncpg.pool.Pool | None] = (),
+        *,
+        limiter: AcquireLimiter | None = None,
+        balancing: ReadBalancing = "least_outstanding",
+        retry_interval: float = 5.0,
+        open_replica: Callable[[int], Awaitable[asyncpg.pool.Pool]] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.primary = primary
+        self.limiter = limiter or AcquireLimiter()
+        self._balancing = balancing
+        self._retry_interval = retry_interval
+        self._open_replica = open_replica
+        self._clock = clock
+        self._cursor = 0
+        retry_at = clock() + retry_interval
+        self.replicas = [
+            ReplicaPool(pool, index, unavailable_until=0.0 if pool is not None else retry_at)
+            for index, pool in enumerate(replicas)
+        ]
+
+    def choose(self) -> ReplicaPool | None:
+        count = len(self.replicas)
+        if not count:
+            return None
+        now = self._clock()
+        start = self._cursor
+        self._cursor = (start + 1) % count
+        chosen: ReplicaPool | None = None
+        for offset in range(count):
+            replica = self.replicas[(start + offset) % count]
+            if replica.pool is None:
+                self._start_reopen(replica, now)
+                continue
+            if not replica.is_available(now):
+                continue
+            if self._balancing == "round_robin":
+                return replica
+            if chosen is None or replica.outstanding < chosen.outstanding:
+                chosen = replica
+        return chosen
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[asyncpg.connection.Connection]:
+        replica = self.choose()
+        if replica is not None:
+            connection = await self._acquire_replica(replica)
+            if connection is not None:
+                try:
+                    yield connection
+                finally:
+                    replica.outstanding -= 1
+                    await self.limiter.release(replica.pool, connection)
+                return
+        connection = await self.limiter.acquire(self.primary)
+        try:
+            yield connection
+        finally:
+            await self.limiter.release(self.primary, connection)
+
+    async def _acquire_replica(self, replica: ReplicaPool) -> asyncpg.connection.Connection | None:
+        replica.outstanding += 1
+        connection = None
+        try:
+            connection = await self.limiter.acquire(replica.pool)
+        except REPLICA_UNAVAILABLE_ERRORS:
+            replica.unavailable_until = self._clock() + self._retry_interval
+            logger.warning("PostgreSQL replica is unavailable, reading from primary", exc_info=True)
+        finally:
+            if connection is None:
+                replica.outstanding -= 1
+        return connection
+
+    def _start_reopen(self, replica: ReplicaPool, now: float) -> None:
+        open_replica = self._open_replica
+        if open_replica is None or replica.opening is not None:
+            return
+        if replica.unavailable_until > now:
+            return
+        replica.opening = asyncio.create_task(
+            self._reopen(replica, open_replica), name=f"pg-replica{replica.index}-open"
+        )
+
+    async def _reopen(
+        self,
+        replica: ReplicaPool,
+        open_replica: Callable[[int], Awaitable[asyncpg.pool.Pool]],
+    ) -> None:
+        try:
+            replica.pool = await open_replica(replica.index)
+        except (asyncpg.PostgresError, *REPLICA_UNAVAILABLE_ERRORS):
+            replica.unavailable_until = self._clock() + self._retry_interval
+            logger.warning(
+                "PostgreSQL replica #%d is still unreachable", replica.index, exc_info=True
+            )
+        else:
+            replica.unavailable_until = 0.0
+            logger.info("Opened the pool of PostgreSQL replica #%d", replica.index)
+        finally:
+            replica.opening = None
+
+    async def _cancel_reopens(self) -> None:
+        tasks = [replica.opening for replica in self.replicas if replica.opening is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def close(self) -> None:
+        await self._cancel_reopens()
+        await asyncio.gather(
+            *(replica.pool.close() for replica in self.replicas if replica.pool is not None)
+        )
+
+    def terminate(self) -> None:
+        for replica in self.replicas:
+            if replica.opening is not None:
+                replica.opening.cancel()
+            if replica.pool is not None:
+                replica.pool.terminate()
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import json
+import time
+from collections.abc import Callable
+from functools import partial
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+from .timing import SERIALIZE, record_timing
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - optional dependency
+    msgspec = None
+
+
+def _stdlib_dumps(content: Any, default: Callable[[Any], Any] | None = None) -> bytes:
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+        default=default,
+    ).encode("utf-8")
+
+
+def _select_dumps() -> Callable[[Any], bytes]:
+    if orjson is not None:
+        return orjson.dumps
+    if msgspec is not None:
+        return msgspec.json.encode
+    return _stdlib_dumps
+
+
+def _select_lenient_dumps() -> Callable[[Any], bytes]:
+    if orjson is not None:
+        return partial(orjson.dumps, default=str)
+    if msgspec is not None:
+        return msgspec.json.Encoder(enc_hook=str).encode
+    return partial(_stdlib_dumps, default=str)
+
+
+def _select_loads() -> Callable[[bytes | str], Any]:
+    if orjson is not None:
+        return orjson.loads
+    if msgspec is not None:
+        return msgspec.json.decode
+    return json.loads
+
+
+dumps_json: Callable[[Any], bytes] = _select_dumps()
+# Database rows may hold Decimal and other types without a JSON form: they become strings.
+dumps_json_lenient: Callable[[Any], bytes] = _select_lenient_dumps()
+loads_json: Callable[[bytes | str], Any] = _select_loads()
+JSON_DECODE_ERRORS: tuple[type[Exception], ...] = (ValueError,) + (
+    (msgspec.DecodeError,) if msgspec is not None else ()
+)
+
+
+def encode_json(content: Any, *, lenient: bool = False) -> bytes:
+    started = time.perf_counter()
+    body = (dumps_json_lenient if lenient else dumps_json)(content)
+    record_timing(SERIALIZE, time.perf_counter() - started)
+    return body
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson or msgspec when installed.
+
+    ``FastJSONResponse(body)`` with ``bytes`` sends them as an already serialized
+    JSON document. FastAPI passes values returned from a route through
+    ``jsonable_encoder`` first, which turns bytes into a JSON string, so routes
+    with a pre-serialized body return ``FastJSONResponse(body)`` themselves.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes | bytearray | memoryview):
+            return bytes(content)
+        return encode_json(content)
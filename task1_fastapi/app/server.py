@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import socket
+import sys
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import uvicorn
+from uvicorn.main import STARTUP_FAILURE
+from uvicorn.supervisors import Multiprocess
+
+from .settings import PostgresSettings, ServerSettings
+
+APP_FACTORY = "task1_fastapi.app.main:create_app"
+
+ShutdownHook = Callable[[], Awaitable[object]]
+
+
+def _find_shutdown_hook(app: Any) -> ShutdownHook | None:
+    # uvicorn wraps the application in its own middlewares (proxy headers, message logger).
+    while app is not None:
+        state = getattr(app, "state", None)
+        if state is not None:
+            return getattr(state, "begin_shutdown", None)
+        app = getattr(app, "app", None)
+    return None
+
+
+class DrainingServer(uvicorn.Server):
+    """uvicorn server that lets the app start draining as soon as shutdown begins.
+
+    uvicorn sends the lifespan shutdown event only after in-flight requests have
+    finished or been cancelled, which is too late to turn new database work away.
+    The app's ``begin_shutdown`` hook runs first instead, while the socket still
+    accepts requests (so probes see "draining"), and the time it takes is counted
+    against ``timeout_graceful_shutdown``.
+    """
+
+    async def shutdown(self, sockets: list[socket.socket] | None = None) -> None:
+        hook = _find_shutdown_hook(getattr(self.config, "loaded_app", None))
+        timeout = self.config.timeout_graceful_shutdown
+        if hook is not None and not self.force_exit:
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            await hook()
+            if timeout is not None:
+                remaining = max(0.0, timeout - (loop.time() - started))
+                self.config.timeout_graceful_shutdown = remaining
+        await super().shutdown(sockets)
+
+
+def run(settings: ServerSettings | None = None) -> None:
+    settings = settings or ServerSettings()
+    # Worker processes read the count back to size their share of the connection budget.
+    os.environ["SERVER_WORKERS"] = str(settings.workers)
+    timeout = settings.shutdown_timeout
+    if timeout is None:
+        # Requests still holding a connection after the drain grace would be terminated
+        # with their connection anyway, so uvicorn does not wait for them any longer.
+        timeout = PostgresSettings().shutdown_grace
+    config = uvicorn.Config(
+        APP_FACTORY,
+        factory=True,
+        host=settings.host,
+        port=settings.port,
+        workers=settings.workers,
+        timeout_graceful_shutdown=timeout,
+    )
+    server = DrainingServer(config)
+    try:
+        if config.workers > 1:
+            Multiprocess(config, target=server.run, sockets=[config.bind_socket()]).run()
+        else:
+            server.run()
+    except KeyboardInterrupt:
+        pass
+    if not server.started and config.workers == 1:
+        sys.exit(STARTUP_FAILURE)
+
+
+if __name__ == "__main__":
+    run()
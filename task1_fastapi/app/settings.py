@@ -1,5 +1,7 @@
-from pydantic import Field, SecretStr, model_validator
-from pydantic_settings import BaseSettings, SettingsConfigDict
+from typing import Annotated, Literal
+
+from pydantic import AliasChoices, Field, SecretStr, field_validator, model_validator
+from pydantic_settings import BaseSettings, NoDecode, SettingsConfigDict
 
 
 class PostgresSettings(BaseSettings):
@@ -13,9 +15,228 @@ class PostgresSettings(BaseSettings):
     min_size: int = Field(default=1, validation_alias="DB_POOL_MIN_SIZE", ge=1)
     max_size: int = Field(default=10, validation_alias="DB_POOL_MAX_SIZE", ge=1)
     command_timeout: float = Field(default=30.0, validation_alias="DB_COMMAND_TIMEOUT", gt=0.0)
+    acquire_timeout: float | None = Field(
+        default=None,
+        validation_alias="DB_POOL_ACQUIRE_TIMEOUT",
+        gt=0.0,
+    )
+    max_waiters: int | None = Field(default=None, validation_alias="DB_POOL_MAX_WAITERS", ge=0)
+    retry_after: int = Field(default=1, validation_alias="DB_POOL_RETRY_AFTER", ge=0)
+    max_inactive_lifetime: float = Field(
+        default=300.0,
+        validation_alias="DB_POOL_MAX_INACTIVE_LIFETIME",
+        ge=0.0,
+    )
+    autoscale: bool = Field(default=False, validation_alias="DB_POOL_AUTOSCALE")
+    autoscale_interval: float = Field(
+        default=1.0,
+        validation_alias="DB_POOL_AUTOSCALE_INTERVAL",
+        gt=0.0,
+    )
+    autoscale_target_wait: float = Field(
+        default=0.005,
+        validation_alias="DB_POOL_AUTOSCALE_TARGET_WAIT",
+        ge=0.0,
+    )
+    autoscale_scale_down_after: int = Field(
+        default=30,
+        validation_alias="DB_POOL_AUTOSCALE_SCALE_DOWN_AFTER",
+        ge=1,
+    )
+    breaker_failure_threshold: int = Field(
+        default=5,
+        validation_alias="DB_BREAKER_FAILURE_THRESHOLD",
+        ge=0,
+    )
+    breaker_reset_timeout: float = Field(
+        default=10.0,
+        validation_alias="DB_BREAKER_RESET_TIMEOUT",
+        gt=0.0,
+    )
+    breaker_half_open_calls: int = Field(
+        default=1,
+        validation_alias="DB_BREAKER_HALF_OPEN_CALLS",
+        ge=1,
+    )
+    # Type codecs installed on every connection (see type_codecs.CodecRegistry).
+    json_codecs: bool = Field(default=True, validation_alias="DB_JSON_CODECS")
+    numeric_as_float: bool = Field(default=False, validation_alias="DB_NUMERIC_AS_FLOAT")
+    uuid_as_text: bool = Field(default=False, validation_alias="DB_UUID_AS_TEXT")
+    shutdown_grace: float = Field(default=10.0, validation_alias="DB_SHUTDOWN_GRACE", ge=0.0)
+    connect_in_background: bool = Field(default=False, validation_alias="DB_CONNECT_IN_BACKGROUND")
+    connect_retry_interval: float = Field(
+        default=0.5,
+        validation_alias="DB_CONNECT_RETRY_INTERVAL",
+        gt=0.0,
+    )
+    connect_retry_max_interval: float = Field(
+        default=30.0,
+        validation_alias="DB_CONNECT_RETRY_MAX_INTERVAL",
+        gt=0.0,
+    )
+    # Route class -> connections the class may hold at once; unlisted classes are not capped.
+    bulkheads: dict[str, int] = Field(default_factory=dict, validation_alias="DB_BULKHEADS")
+    replica_dsns: Annotated[list[str], NoDecode] = Field(
+        default_factory=list,
+        validation_alias="DB_REPLICA_DSNS",
+    )
+    read_balancing: Literal["least_outstanding", "round_robin"] = Field(
+        default="least_outstanding",
+        validation_alias="DB_READ_BALANCING",
+    )
+    replica_retry_interval: float = Field(
+        default=5.0,
+        validation_alias="DB_REPLICA_RETRY_INTERVAL",
+        gt=0.0,
+    )
+
+    @field_validator("replica_dsns", mode="before")
+    @classmethod
+    def split_replica_dsns(cls, value: object) -> object:
+        if isinstance(value, str):
+            return [dsn.strip() for dsn in value.split(",") if dsn.strip()]
+        return value
 
     @model_validator(mode="after")
     def validate_pool_size(self) -> "PostgresSettings":
         if self.min_size > self.max_size:
             raise ValueError("DB_POOL_MIN_SIZE cannot exceed DB_POOL_MAX_SIZE")
+        if any(not 1 <= quota <= self.max_size for quota in self.bulkheads.values()):
+            raise ValueError("DB_BULKHEADS quotas must be between 1 and DB_POOL_MAX_SIZE")
         return self
+
+    def for_workers(self, workers: int) -> "PostgresSettings":
+        """Split the pool sizes, treated as a deployment-wide budget, across workers."""
+        if workers <= 1:
+            return self
+        max_size = max(1, self.max_size // workers)
+        min_size = min(max(1, self.min_size // workers), max_size)
+        bulkheads = {
+            name: min(max(1, quota // workers), max_size) for name, quota in self.bulkheads.items()
+        }
+        return self.model_copy(
+            update={"min_size": min_size, "max_size": max_size, "bulkheads": bulkheads}
+        )
+
+
+class CacheSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
+
+    db_version_ttl: float = Field(default=60.0, validation_alias="CACHE_DB_VERSION_TTL", ge=0.0)
+    db_version_max_age: int = Field(
+        default=0,
+        validation_alias="CACHE_DB_VERSION_MAX_AGE",
+        ge=0,
+    )
+    shared_path: str | None = Field(default=None, validation_alias="CACHE_SHARED_PATH")
+    shared_slots: int = Field(default=1024, validation_alias="CACHE_SHARED_SLOTS", ge=1)
+    shared_slot_size: int = Field(default=4096, validation_alias="CACHE_SHARED_SLOT_SIZE", ge=64)
+    # NOTIFY channel -> cache keys evicted when a notification arrives on it.
+    invalidation_channels: dict[str, list[str]] = Field(
+        default_factory=dict,
+        validation_alias="CACHE_INVALIDATION_CHANNELS",
+    )
+    invalidation_reconnect_interval: float = Field(
+        default=1.0,
+        validation_alias="CACHE_INVALIDATION_RECONNECT_INTERVAL",
+        gt=0.0,
+    )
+
+
+class ServerSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
+
+    host: str = Field(default="127.0.0.1", validation_alias="SERVER_HOST")
+    port: int = Field(default=8000, validation_alias="SERVER_PORT", ge=0, le=65535)
+    workers: int = Field(
+        default=1,
+        validation_alias=AliasChoices("SERVER_WORKERS", "WEB_CONCURRENCY"),
+        ge=1,
+    )
+    # Seconds from the start of shutdown until in-flight requests are cancelled;
+    # defaults to DB_SHUTDOWN_GRACE.
+    shutdown_timeout: float | None = Field(
+        default=None,
+        validation_alias="SERVER_SHUTDOWN_TIMEOUT",
+        gt=0.0,
+    )
+    timing_header: bool = Field(default=True, validation_alias="SERVER_TIMING_HEADER")
+    timing_log: bool = Field(default=False, validation_alias="SERVER_TIMING_LOG")
+
+
+class TenantSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
+
+    dsns: dict[str, str] = Field(default_factory=dict, validation_alias="DB_TENANT_DSNS")
+    header: str = Field(default="X-Tenant", validation_alias="DB_TENANT_HEADER")
+    pool_max_size: int = Field(default=5, validation_alias="DB_TENANT_POOL_MAX_SIZE", ge=1)
+    max_connections: int = Field(default=50, validation_alias="DB_TENANT_MAX_CONNECTIONS", ge=1)
+    idle_timeout: float = Field(default=300.0, validation_alias="DB_TENANT_IDLE_TIMEOUT", gt=0.0)
+
+    @model_validator(mode="after")
+    def validate_budget(self) -> "TenantSettings":
+        if self.pool_max_size > self.max_connections:
+            raise ValueError("DB_TENANT_POOL_MAX_SIZE cannot exceed DB_TENANT_MAX_CONNECTIONS")
+        return self
+
+    def for_workers(self, workers: int) -> "TenantSettings":
+        """Split the tenant connection budget across workers, like ``PostgresSettings``."""
+        if workers <= 1:
+            return self
+        max_connections = max(1, self.max_connections // workers)
+        pool_max_size = min(max(1, self.pool_max_size // workers), max_connections)
+        return self.model_copy(
+            update={"max_connections": max_connections, "pool_max_size": pool_max_size}
+        )
+
+
+class ExportSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
+
+    chunk_size: int = Field(default=1000, validation_alias="EXPORT_CHUNK_SIZE", ge=1)
+
+
+class IngestSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
+
+    # Target name -> allowed columns; the name may be schema-qualified ("analytics.events").
+    tables: dict[str, list[str]] = Field(default_factory=dict, validation_alias="INGEST_TABLES")
+    batch_size: int = Field(default=5000, validation_alias="INGEST_BATCH_SIZE", ge=1)
+
+
+class DeadlineSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
+
+    default: float | None = Field(default=None, validation_alias="REQUEST_DEADLINE", gt=0.0)
+    # Route name -> deadline in seconds, overriding REQUEST_DEADLINE.
+    routes: dict[str, float] = Field(default_factory=dict, validation_alias="REQUEST_DEADLINES")
+    # Route names cancelled on client disconnect even without a deadline.
+    disconnect_routes: list[str] = Field(
+        default_factory=list,
+        validation_alias="REQUEST_CANCEL_ON_DISCONNECT",
+    )
+
+    def for_route(self, name: str) -> float | None:
+        return self.routes.get(name, self.default)
+
+    def cancels_on_disconnect(self, name: str) -> bool:
+        return name in self.disconnect_routes or self.for_route(name) is not None
+
+
+class BatchSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
+
+    max_queries: int = Field(default=50, validation_alias="BATCH_MAX_QUERIES", ge=1)
+
+
+class LoopMonitorSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
+
+    enabled: bool = Field(default=True, validation_alias="LOOP_MONITOR_ENABLED")
+    interval: float = Field(default=0.1, validation_alias="LOOP_MONITOR_INTERVAL", gt=0.0)
+    # Stalls at least this long are counted and logged with the loop thread's stack.
+    slow_threshold: float = Field(
+        default=0.1,
+        validation_alias="LOOP_MONITOR_SLOW_THRESHOLD",
+        gt=0.0,
+    )
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager, suppress
+
+MAGIC = b"EPTSHM01"
+HEADER = struct.Struct("<8sII")
+HEADER_SIZE = 64
+# Each slot starts with a sequence number followed by the entry header:
+# key hash, expires_at (unix time), key length, value length.
+SEQ = struct.Struct("<Q")
+ENTRY = struct.Struct("<QdHI")
+SLOT_HEADER_SIZE = SEQ.size + ENTRY.size
+READ_RETRIES = 8
+
+logger = logging.getLogger(__name__)
+
+
+def _key_hash(key: bytes) -> int:
+    # Python's hash() is salted per process, so workers need a stable digest instead.
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+
+class SharedMemoryCache:
+    """Fixed-size, direct-mapped cache in an mmap-ed file shared by worker processes.
+
+    Readers are lock-free: every slot carries a sequence counter that writers make
+    odd while updating (a seqlock), and a torn read is retried or treated as a miss.
+    Writers serialize per slot with an ``fcntl`` byte-range lock.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        slots: int = 1024,
+        slot_size: int = 4096,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if slots <= 0:
+            raise ValueError("slots must be positive")
+        if slot_size <= SLOT_HEADER_SIZE:
+            raise ValueError(f"slot_size must be larger than {SLOT_HEADER_SIZE} bytes")
+        self._slots = slots
+        self._slot_size = slot_size
+        self._clock = clock
+        size = HEADER_SIZE + slots * slot_size
+        self._fd = self._open_file(path, size)
+        try:
+            self._mm = mmap.mmap(self._fd, size)
+        except BaseException:
+            os.close(self._fd)
+            raise
+
+    @property
+    def max_item_size(self) -> int:
+        return self._slot_size - SLOT_HEADER_SIZE
+
+    def get(self, key: str) -> bytes | None:
+        key_bytes = key.encode()
+        key_hash = _key_hash(key_bytes)
+        offset = self._slot_offset(key_hash)
+        data_offset = offset + SLOT_HEADER_SIZE
+        mm = self._mm
+        for _ in range(READ_RETRIES):
+            seq = SEQ.unpack_from(mm, offset)[0]
+            if seq & 1:
+                continue
+            slot_hash, expires_at, key_len, value_len = ENTRY.unpack_from(mm, offset + SEQ.size)
+            if seq == 0 or slot_hash != key_hash or expires_at <= self._clock():
+                return None
+            if key_len + value_len > self.max_item_size:
+                continue
+            stored_key = mm[data_offset : data_offset + key_len]
+            value = mm[data_offset + key_len : data_offset + key_len + value_len]
+            if SEQ.unpack_from(mm, offset)[0] != seq:
+                continue
+            return value if stored_key == key_bytes else None
+        return None
+
+    def set(self, key: str, value: bytes, ttl: float) -> bool:
+        key_bytes = key.encode()
+        if len(key_bytes) + len(value) > self.max_item_size:
+            return False
+        key_hash = _key_hash(key_bytes)
+        offset = self._slot_offset(key_hash)
+        with self._write(offset) as mm:
+            ENTRY.pack_into(
+                mm,
+                offset + SEQ.size,
+                key_hash,
+                self._clock() + ttl,
+                len(key_bytes),
+                len(value),
+            )
+            data_offset = offset + SLOT_HEADER_SIZE
+            mm[data_offset : data_offset + len(key_bytes)] = key_bytes
+            mm[data_offset + len(key_bytes) : data_offset + len(key_bytes) + len(value)] = value
+        return True
+
+    def delete(self, key: str) -> None:
+        key_bytes = key.encode()
+        key_hash = _key_hash(key_bytes)
+        offset = self._slot_offset(key_hash)
+        with self._write(offset) as mm:
+            if ENTRY.unpack_from(mm, offset + SEQ.size)[0] == key_hash:
+                ENTRY.pack_into(mm, offset + SEQ.size, 0, 0.0, 0, 0)
+
+    def close(self) -> None:
+        if not self._mm.closed:
+            self._mm.close()
+            os.close(self._fd)
+
+    def _slot_offset(self, key_hash: int) -> int:
+        return HEADER_SIZE + (key_hash % self._slots) * self._slot_size
+
+    @contextmanager
+    def _write(self, offset: int) -> Iterator[mmap.mmap]:
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, self._slot_size, offset)
+        try:
+            mm = self._mm
+            seq = SEQ.unpack_from(mm, offset)[0] | 1
+            SEQ.pack_into(mm, offset, seq)
+            try:
+                yield mm
+            finally:
+                SEQ.pack_into(mm, offset, seq + 1)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, self._slot_size, offset)
+
+    def _open_file(self, path: str, size: int) -> int:
+        """Open ``path`` and make sure it holds this cache's layout.
+
+        Workers serialize setup on the header's byte range. A file written with other
+        ``slots``/``slot_size`` values is replaced by a fresh one rather than resized in
+        place, so a process still mapping the old layout keeps its own inode instead of
+        faulting on a truncated mapping.
+        """
+        header = HEADER.pack(MAGIC, self._slots, self._slot_size)
+        while True:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.lockf(fd, fcntl.LOCK_EX, HEADER_SIZE, 0)
+                if os.stat(path).st_ino != os.fstat(fd).st_ino:
+                    # Another worker replaced the file while this one waited for the lock.
+                    os.close(fd)
+                    continue
+                current = os.pread(fd, HEADER.size, 0)
+                if current == header:
+                    if os.fstat(fd).st_size < size:
+                        os.ftruncate(fd, size)
+                elif current.strip(b"\0"):
+                    logger.warning("Replacing shared cache file %s with a new layout", path)
+                    stale, fd = fd, self._create_file(path, size, header)
+                    os.close(stale)
+                    return fd
+                else:
+                    os.ftruncate(fd, size)
+                    os.pwrite(fd, header, 0)
+                fcntl.lockf(fd, fcntl.LOCK_UN, HEADER_SIZE, 0)
+                return fd
+            except BaseException:
+                os.close(fd)
+                raise
+
+    @staticmethod
+    def _create_file(path: str, size: int, header: bytes) -> int:
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        fd = os.open(temp_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            os.ftruncate(fd, size)
+            os.pwrite(fd, header, 0)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.close(fd)
+            with suppress(OSError):
+                os.unlink(temp_path)
+            raise
+        return fd
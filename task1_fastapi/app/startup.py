@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+
+import asyncpg
+from fastapi import FastAPI
+
+from .autoscaler import PoolAutoscaler
+from .metrics import AppMetrics
+from .pools import (
+    AcquireLimiter,
+    PoolCapacity,
+    PoolFactory,
+    ReadPoolRouter,
+    create_pg_pool,
+    create_replica_pools,
+)
+from .settings import PostgresSettings
+from .statements import StatementRegistry
+from .type_codecs import CodecRegistry
+
+logger = logging.getLogger(__name__)
+
+# Errors that mean Postgres is not reachable (yet), as opposed to a configuration bug.
+CONNECT_ERRORS: tuple[type[BaseException], ...] = (
+    OSError,
+    TimeoutError,
+    asyncpg.PostgresError,
+    asyncpg.InterfaceError,
+)
+
+
+async def open_database(app: FastAPI, settings: PostgresSettings) -> None:
+    """Create the primary pool and everything built on it, then publish them on ``app.state``.
+
+    ``asyncpg.create_pool`` returns once ``min_size`` connections are open, so the
+    app is ready, with warm connections, as soon as ``app.state.pg_pool`` is set.
+    """
+    statements: StatementRegistry = app.state.statements
+    metrics: AppMetrics = app.state.metrics
+    codecs: CodecRegistry = app.state.codecs
+    limiter: AcquireLimiter = app.state.pg_acquire_limiter
+    pool_factory: PoolFactory = getattr(app.state, "pg_pool_factory", create_pg_pool)
+    pool = await pool_factory(settings, statements, codecs=codecs)
+    replicas = await create_replica_pools(settings, statements, codecs=codecs)
+    if settings.autoscale:
+        capacity = PoolCapacity(settings.min_size)
+        limiter.set_capacity(pool, capacity)
+        metrics.track_capacity("primary", capacity)
+        autoscaler = PoolAutoscaler(
+            capacity,
+            min_size=settings.min_size,
+            max_size=settings.max_size,
+            interval=settings.autoscale_interval,
+            target_wait=settings.autoscale_target_wait,
+            scale_down_after=settings.autoscale_scale_down_after,
+        )
+        autoscaler.start()
+        app.state.pg_autoscaler = autoscaler
+    metrics.track_pool("primary", pool)
+    for index, replica in enumerate(replicas):
+        if replica is not None:
+            metrics.track_pool(f"replica{index}", replica)
+
+    async def open_replica(index: int) -> asyncpg.pool.Pool:
+        dsn = settings.replica_dsns[index]
+        replica = await create_pg_pool(settings, statements, dsn=dsn, codecs=codecs)
+        metrics.track_pool(f"replica{index}", replica)
+        return replica
+
+    app.state.pg_read_router = ReadPoolRouter(
+        pool,
+        replicas,
+        limiter=limiter,
+        balancing=settings.read_balancing,
+        retry_interval=settings.replica_retry_interval,
+        open_replica=open_replica,
+    )
+    app.state.pg_pool = pool
+
+
+async def connect_with_backoff(app: FastAPI, settings: PostgresSettings) -> None:
+    """Call ``open_database`` until it succeeds, backing off exponentially with jitter.
+
+    The jitter spreads out reconnects of workers and replicas restarted together.
+    """
+    delay = settings.connect_retry_interval
+    attempt = 1
+    while True:
+        try:
+            await open_database(app, settings)
+        except CONNECT_ERRORS:
+            pause = delay / 2 + random.uniform(0, delay / 2)
+            logger.warning(
+                "PostgreSQL is unavailable (attempt %d), retrying in %.1fs",
+                attempt,
+                pause,
+                exc_info=True,
+            )
+            await asyncio.sleep(pause)
+            delay = min(delay * 2, settings.connect_retry_max_interval)
+            attempt += 1
+        else:
+            logger.info("PostgreSQL connection pool is ready after %d attempt(s)", attempt)
+            return
+
+
+def start_connecting(app: FastAPI, settings: PostgresSettings) -> asyncio.Task[None]:
+    """Run ``connect_with_backoff`` in the background and log it if it fails for good."""
+    task = asyncio.create_task(connect_with_backoff(app, settings), name="pg-connect")
+
+    def on_done(done: asyncio.Task[None]) -> None:
+        if done.cancelled() or done.exception() is None:
+            return
+        # Only unexpected errors end the retry loop: the app stays unready until restarted.
+        app.state.pg_connect_failed = True
+        logger.error("Connecting to PostgreSQL failed", exc_info=done.exception())
+
+    task.add_done_callback(on_done)
+    return task
+
+
+async def close_database(app: FastAPI, *, terminate: bool = False) -> None:
+    """Close the primary and replica pools; ``terminate`` drops connections still in use."""
+    autoscaler: PoolAutoscaler | None = getattr(app.state, "pg_autoscaler", None)
+    if autoscaler is not None:
+        await autoscaler.stop()
+    router: ReadPoolRouter | None = getattr(app.state, "pg_read_router", None)
+    pool: asyncpg.pool.Pool | None = getattr(app.state, "pg_pool", None)
+    if terminate:
+        if router is not None:
+            router.terminate()
+        if pool is not None:
+            pool.terminate()
+        return
+    if router is not None:
+        await router.close()
+    if pool is not None:
+        await pool.close()
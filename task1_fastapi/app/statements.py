@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import time
+from typing import Any
+
+import asyncpg
+from asyncpg.prepared_stmt import PreparedStatement
+
+from .metrics import AppMetrics
+from .timing import DB_QUERY, record_timing
+
+
+class StatementConnection(asyncpg.Connection):
+    """Connection class that keeps the statements prepared by ``StatementRegistry``."""
+
+    __slots__ = ("named_statements",)
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.named_statements: dict[str, PreparedStatement] = {}
+
+
+class StatementRegistry:
+    def __init__(self, metrics: AppMetrics | None = None) -> None:
+        self._queries: dict[str, str] = {}
+        self._exportable: set[str] = set()
+        self._batchable: set[str] = set()
+        self._metrics = metrics
+        self.hits = 0
+        self.misses = 0
+        if metrics is not None:
+            metrics.track_statements(self)
+
+    @property
+    def names(self) -> tuple[str, ...]:
+        return tuple(self._queries)
+
+    def register(
+        self,
+        name: str,
+        query: str,
+        *,
+        exportable: bool = False,
+        batchable: bool = False,
+    ) -> str:
+        registered = self._queries.get(name)
+        if registered is not None and registered != query:
+            raise ValueError(f"Statement {name!r} is already registered with a different query")
+        self._queries[name] = query
+        if exportable:
+            self._exportable.add(name)
+        if batchable:
+            self._batchable.add(name)
+        return name
+
+    def is_exportable(self, name: str) -> bool:
+        return name in self._exportable
+
+    def is_batchable(self, name: str) -> bool:
+        return name in self._batchable
+
+    def query(self, name: str) -> str:
+        try:
+            return self._queries[name]
+        except KeyError:
+            raise LookupError(f"Statement {name!r} is not registered") from None
+
+    async def prepare_connection(self, connection: asyncpg.Connection) -> None:
+        statements = getattr(connection, "named_statements", None)
+        if statements is None:
+            return
+        for name, query in self._queries.items():
+            statements[name] = await connection.prepare(query)
+
+    async def statement(self, connection: asyncpg.Connection, name: str) -> PreparedStatement:
+        statements = getattr(connection, "named_statements", None)
+        if statements is not None:
+            statement = statements.get(name)
+            if statement is not None:
+                self.hits += 1
+                return statement
+        self.misses += 1
+        statement = await connection.prepare(self.query(name))
+        if statements is not None:
+            statements[name] = statement
+        return statement
+
+    async def fetch(self, connection: asyncpg.Connection, name: str, *args: Any) -> list[Any]:
+        return await self._run(connection, name, "fetch", args)
+
+    async def fetchrow(self, connection: asyncpg.Connection, name: str, *args: Any) -> Any:
+        return await self._run(connection, name, "fetchrow", args)
+
+    async def fetchval(self, connection: asyncpg.Connection, name: str, *args: Any) -> Any:
+        return await self._run(connection, name, "fetchval", args)
+
+    async def _run(
+        self,
+        connection: asyncpg.Connection,
+        name: str,
+        method: str,
+        args: tuple[Any, ...],
+    ) -> Any:
+        started = time.perf_counter()
+        try:
+            return await self._execute(connection, name, method, args)
+        except Exception:
+            if self._metrics is not None:
+                self._metrics.query_errors.labels(name).inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            record_timing(DB_QUERY, elapsed)
+            if self._metrics is not None:
+                self._metrics.query_seconds.labels(name).observe(elapsed)
+
+    async def _execute(
+        self,
+        connection: asyncpg.Connection,
+        name: str,
+        method: str,
+        args: tuple[Any, ...],
+    ) -> Any:
+        statement = await self.statement(connection, name)
+        try:
+            return await getattr(statement, method)(*args)
+        except asyncpg.InvalidCachedStatementError:
+            # The schema changed under the prepared statement: prepare it again once.
+            self._forget(connection, name)
+            statement = await self.statement(connection, name)
+            return await getattr(statement, method)(*args)
+
+    @staticmethod
+    def _forget(connection: asyncpg.Connection, name: str) -> None:
+        statements = getattr(connection, "named_statements", None)
+        if statements is not None:
+            statements.pop(name, None)
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass, field
+
+import asyncpg
+
+from .pools import PoolSaturatedError, create_pg_pool
+from .settings import PostgresSettings
+from .statements import StatementRegistry
+from .type_codecs import CodecRegistry
+
+logger = logging.getLogger(__name__)
+
+# A pool touched this recently may be about to hand out a connection, so it is not evicted.
+EVICTION_GRACE = 1.0
+
+
+class UnknownTenantError(LookupError):
+    """Raised when a request names a tenant that has no DSN configured."""
+
+
+@dataclass(slots=True)
+class TenantPool:
+    pool: asyncpg.pool.Pool
+    max_size: int
+    last_used: float = field(default=0.0)
+
+    def in_use(self) -> int:
+        return self.pool.get_size() - self.pool.get_idle_size()
+
+
+class TenantPoolManager:
+    """Creates per-tenant pools on demand within a global connection budget.
+
+    Each pool reserves its ``max_size`` from the budget. When a new pool does not
+    fit, idle pools are closed in least-recently-used order; pools idle for longer
+    than ``idle_timeout`` are closed by the background sweeper.
+    """
+
+    def __init__(
+        self,
+        dsns: Mapping[str, str],
+        settings: PostgresSettings,
+        statements: StatementRegistry,
+        *,
+        codecs: CodecRegistry | None = None,
+        pool_max_size: int = 5,
+        max_connections: int = 50,
+        idle_timeout: float = 300.0,
+        retry_after: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if pool_max_size > max_connections:
+            raise ValueError("pool_max_size cannot exceed max_connections")
+        self._dsns = dict(dsns)
+        self._settings = settings
+        self._statements = statements
+        self._codecs = codecs
+        self._pool_max_size = pool_max_size
+        self._max_connections = max_connections
+        self._idle_timeout = idle_timeout
+        self._retry_after = retry_after
+        self._clock = clock
+        self._pools: OrderedDict[str, TenantPool] = OrderedDict()
+        self._creating: dict[str, asyncio.Future[TenantPool]] = {}
+        self._task: asyncio.Task[None] | None = None
+        self.evictions = 0
+
+    @property
+    def reserved(self) -> int:
+        return sum(tenant.max_size for tenant in self._pools.values())
+
+    @property
+    def pool_count(self) -> int:
+        return len(self._pools)
+
+    def has_tenant(self, tenant: str) -> bool:
+        return tenant in self._dsns
+
+    async def get_pool(self, tenant: str) -> asyncpg.pool.Pool:
+        entry = self._pools.get(tenant)
+        if entry is None:
+            creating = self._creating.get(tenant)
+            if creating is None:
+                creating = asyncio.ensure_future(self._create(tenant))
+                self._creating[tenant] = creating
+                creating.add_done_callback(lambda _: self._creating.pop(tenant, None))
+            entry = await asyncio.shield(creating)
+        entry.last_used = self._clock()
+        self._pools.move_to_end(tenant)
+        return entry.pool
+
+    def start(self, interval: float = 30.0) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._sweep(interval), name="pg-tenant-sweeper")
+
+    async def close(self, *, terminate: bool = False) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        pools = [entry.pool for entry in self._pools.values()]
+        self._pools.clear()
+        if terminate:
+            for pool in pools:
+                pool.terminate()
+            return
+        await asyncio.gather(*(pool.close() for pool in pools))
+
+    async def evict_idle(self) -> None:
+        deadline = self._clock() - self._idle_timeout
+        for tenant, entry in list(self._pools.items()):
+            if entry.last_used <= deadline and not entry.in_use():
+                await self._evict(tenant)
+
+    async def _create(self, tenant: str) -> TenantPool:
+        dsn = self._dsns.get(tenant)
+        if dsn is None:
+            raise UnknownTenantError(tenant)
+        await self._make_room(self._pool_max_size)
+        pool = await create_pg_pool(
+            self._settings,
+            self._statements,
+            dsn=dsn,
+            codecs=self._codecs,
+            min_size=0,
+            max_size=self._pool_max_size,
+        )
+        entry = TenantPool(pool, self._pool_max_size, self._clock())
+        self._pools[tenant] = entry
+        return entry
+
+    async def _make_room(self, size: int) -> None:
+        # Pools being created elsewhere have not reserved their share yet, so count them too.
+        pending = len(self._creating) - 1
+        needed = self.reserved + (pending + 1) * size - self._max_connections
+        if needed <= 0:
+            return
+        grace = self._clock() - EVICTION_GRACE
+        for tenant, entry in list(self._pools.items()):
+            if entry.last_used > grace or entry.in_use():
+                continue
+            await self._evict(tenant)
+            needed -= entry.max_size
+            if needed <= 0:
+                return
+        raise PoolSaturatedError("tenant_budget", self._retry_after)
+
+    async def _evict(self, tenant: str) -> None:
+        entry = self._pools.pop(tenant, None)
+        if entry is None:
+            return
+        self.evictions += 1
+        logger.info("Closing idle connection pool of tenant %s", tenant)
+        await entry.pool.close()
+
+    async def _sweep(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.evict_idle()
+            except Exception:
+                logger.exception("Tenant pool sweep failed")
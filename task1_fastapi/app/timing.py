@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import json
+import logging
+import time
+from contextvars import ContextVar
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+DB_ACQUIRE = "db_acquire"
+DB_QUERY = "db_query"
+SERIALIZE = "serialize"
+TOTAL = "total"
+
+
+class RequestTimings:
+    __slots__ = ("started", "durations")
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.durations: dict[str, float] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    def finish(self) -> None:
+        self.durations[TOTAL] = time.perf_counter() - self.started
+
+    def header_value(self) -> str:
+        return ", ".join(
+            f"{name};dur={seconds * 1000:.3f}" for name, seconds in self.durations.items()
+        )
+
+
+_current_timings: ContextVar[RequestTimings | None] = ContextVar("server_timing", default=None)
+
+
+def record_timing(name: str, seconds: float) -> None:
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+class ServerTimingMiddleware:
+    """Reports DB acquire, query and serialization time in a ``Server-Timing`` header."""
+
+    def __init__(self, app: ASGIApp, *, header: bool = True, log: bool = False) -> None:
+        self.app = app
+        self.header = header
+        self.log = log
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not (self.header or self.log):
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current_timings.set(timings)
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                timings.finish()
+                if self.header:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", timings.header_value().encode("latin-1")))
+                    message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_timings.reset(token)
+            if self.log:
+                if TOTAL not in timings.durations:
+                    timings.finish()
+                self._log(scope, status_code, timings)
+
+    @staticmethod
+    def _log(scope: Scope, status_code: int, timings: RequestTimings) -> None:
+        route = scope.get("route")
+        payload = {
+            "method": scope["method"],
+            "route": getattr(route, "path", scope["path"]),
+            "status": status_code,
+        }
+        for name, seconds in timings.durations.items():
+            payload[f"{name}_ms"] = round(seconds * 1000, 3)
+        logger.info("server_timing %s", json.dumps(payload, separators=(",", ":")))
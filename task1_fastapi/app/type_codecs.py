@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import logging
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any, Literal
+
+import asyncpg
+
+from .responses import dumps_json, loads_json
+
+logger = logging.getLogger(__name__)
+
+CodecFormat = Literal["text", "binary", "tuple"]
+
+# Binary jsonb values are prefixed with a format version byte.
+JSONB_VERSION = b"\x01"
+
+
+@dataclass(frozen=True, slots=True)
+class TypeCodec:
+    typename: str
+    schema: str
+    encoder: Callable[[Any], Any]
+    decoder: Callable[[Any], Any]
+    format: CodecFormat
+
+
+def _encode_jsonb(value: Any) -> bytes:
+    return JSONB_VERSION + dumps_json(value)
+
+
+def _decode_jsonb(data: bytes) -> Any:
+    if data[:1] != JSONB_VERSION:
+        raise ValueError(f"Unsupported jsonb format version {data[:1]!r}")
+    return loads_json(data[1:])
+
+
+def _encode_json(value: Any) -> bytes:
+    return dumps_json(value)
+
+
+class CodecRegistry:
+    """Type codecs installed on every pooled connection by the pool ``init`` hook.
+
+    Built-in codecs are enabled from settings in ``lifespan``; routes register
+    codecs for their own types in ``register_routes``, next to their statements.
+    Codecs must be set before statements are prepared: ``set_type_codec`` drops the
+    connection's statement cache, so ``apply`` runs first in the init hook.
+    """
+
+    def __init__(self) -> None:
+        self._codecs: dict[tuple[str, str], TypeCodec] = {}
+
+    def register(
+        self,
+        typename: str,
+        *,
+        encoder: Callable[[Any], Any],
+        decoder: Callable[[Any], Any],
+        schema: str = "public",
+        format: CodecFormat = "text",
+    ) -> None:
+        key = (schema, typename)
+        codec = TypeCodec(typename, schema, encoder, decoder, format)
+        registered = self._codecs.get(key)
+        if registered is not None and registered != codec:
+            raise ValueError(f"Codec for {schema}.{typename} is already registered")
+        self._codecs[key] = codec
+
+    def register_json(self) -> None:
+        """Decode json/jsonb straight to Python objects with the fastest JSON library."""
+        self.register(
+            "jsonb",
+            encoder=_encode_jsonb,
+            decoder=_decode_jsonb,
+            schema="pg_catalog",
+            format="binary",
+        )
+        self.register(
+            "json",
+            encoder=_encode_json,
+            decoder=loads_json,
+            schema="pg_catalog",
+            format="binary",
+        )
+
+    def register_numeric_as_float(self) -> None:
+        """Return numeric as float instead of Decimal; trades exactness for speed."""
+        self.register("numeric", encoder=str, decoder=float, schema="pg_catalog")
+
+    def register_uuid_as_text(self) -> None:
+        """Return uuid as str, skipping UUID objects for values that only get serialized."""
+        self.register("uuid", encoder=str, decoder=str, schema="pg_catalog")
+
+    async def apply(self, connection: asyncpg.Connection) -> None:
+        for codec in self._codecs.values():
+            try:
+                await connection.set_type_codec(
+                    codec.typename,
+                    schema=codec.schema,
+                    encoder=codec.encoder,
+                    decoder=codec.decoder,
+                    format=codec.format,
+                )
+            except ValueError:
+                # The type does not exist in this database (e.g. a tenant without the extension).
+                logger.warning(
+                    "Skipping codec for unknown type %s.%s",
+                    codec.schema,
+                    codec.typename,
+                )
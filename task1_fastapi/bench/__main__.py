@@ -0,0 +1,229 @@
+"""Throughput benchmark for the task1 API against a fake asyncpg pool.
+
+    python -m task1_fastapi.bench run --transport asgi --path /api/db_version \\
+        --concurrency 64 --requests 20000 --query-latency 0.001 --output asgi.json
+
+``--transport asgi`` calls the app in-process; ``--transport socket`` starts it
+under uvicorn in a subprocess and sends HTTP/1.1 over a real socket.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import sys
+import time
+from datetime import UTC, datetime
+from functools import partial
+from pathlib import Path
+from typing import Any
+
+from .clients import AsgiClient, SocketClient
+from .fake_pool import fake_pool_factory, fixed_latency
+from .load import LoadResult, RequestFunction, run_load
+
+READY_TIMEOUT = 30.0
+
+
+def configure_environment(args: argparse.Namespace) -> None:
+    # Settings require connection parameters even though the fake pool never connects.
+    for name in ("DB_HOST", "DB_USER", "DB_PASSWORD", "DB_NAME"):
+        os.environ.setdefault(name, "bench")
+    os.environ["DB_POOL_MAX_SIZE"] = str(args.pool_size)
+    os.environ["DB_POOL_MIN_SIZE"] = str(args.pool_size)
+    if not args.cache:
+        # Otherwise /api/db_version is served from the response cache and never hits the pool.
+        os.environ["CACHE_DB_VERSION_TTL"] = "0"
+
+
+def create_bench_app(args: argparse.Namespace) -> Any:
+    configure_environment(args)
+    from task1_fastapi.app.main import create_app
+
+    latency = fixed_latency(args.query_latency, args.latency_jitter)
+    return create_app(pool_factory=fake_pool_factory(latency))
+
+
+def _parse_headers(values: list[str]) -> list[tuple[str, str]]:
+    headers = []
+    for value in values:
+        name, separator, content = value.partition(":")
+        if not separator:
+            raise SystemExit(f"Invalid header {value!r}, expected 'Name: value'")
+        headers.append((name.strip(), content.strip()))
+    return headers
+
+
+async def _measure(send: RequestFunction, args: argparse.Namespace) -> LoadResult:
+    if args.warmup:
+        await run_load(send, concurrency=args.concurrency, requests=args.warmup)
+    return await run_load(
+        send,
+        concurrency=args.concurrency,
+        requests=None if args.duration else args.requests,
+        duration=args.duration,
+    )
+
+
+async def bench_asgi(args: argparse.Namespace, body: bytes) -> LoadResult:
+    app = create_bench_app(args)
+    client = AsgiClient(app)
+    send = partial(client.request, args.method, args.path, body=body, headers=args.headers)
+    async with app.router.lifespan_context(app):
+        return await _measure(send, args)
+
+
+def _free_port(host: str) -> int:
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_ready(client: SocketClient, process: asyncio.subprocess.Process) -> None:
+    deadline = time.monotonic() + READY_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.returncode is not None:
+            raise RuntimeError(f"Benchmark server exited with code {process.returncode}")
+        try:
+            if await client.request("GET", "/readyz") == 200:
+                return
+        except OSError:
+            pass
+        await asyncio.sleep(0.1)
+    raise TimeoutError("Benchmark server did not become ready")
+
+
+async def bench_socket(args: argparse.Namespace, body: bytes) -> LoadResult:
+    port = args.port or _free_port(args.host)
+    process = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-m",
+        "task1_fastapi.bench",
+        "serve",
+        "--host",
+        args.host,
+        "--port",
+        str(port),
+        "--pool-size",
+        str(args.pool_size),
+        "--query-latency",
+        str(args.query_latency),
+        "--latency-jitter",
+        str(args.latency_jitter),
+        "--cache" if args.cache else "--no-cache",
+    )
+    client = SocketClient(args.host, port)
+    try:
+        await _wait_ready(client, process)
+        send = partial(client.request, args.method, args.path, body=body, headers=args.headers)
+        return await _measure(send, args)
+    finally:
+        await client.close()
+        if process.returncode is None:
+            process.terminate()
+            await process.wait()
+
+
+def _report(args: argparse.Namespace, result: LoadResult) -> dict[str, Any]:
+    return {
+        "benchmark": {
+            "transport": args.transport,
+            "method": args.method,
+            "path": args.path,
+            "concurrency": args.concurrency,
+            "requests": None if args.duration else args.requests,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "pool_size": args.pool_size,
+            "query_latency": args.query_latency,
+            "latency_jitter": args.latency_jitter,
+            "cache": args.cache,
+        },
+        "result": result.as_dict(),
+        "environment": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "timestamp": datetime.now(UTC).isoformat(timespec="seconds"),
+        },
+    }
+
+
+def run(args: argparse.Namespace) -> None:
+    body = args.body_file.read_bytes() if args.body_file else b""
+    args.headers = _parse_headers(args.header)
+    bench = bench_asgi if args.transport == "asgi" else bench_socket
+    result = asyncio.run(bench(args, body))
+    report = json.dumps(_report(args, result), indent=2)
+    if args.output:
+        args.output.write_text(report + "\n", encoding="utf-8")
+    print(report)
+
+
+def serve(args: argparse.Namespace) -> None:
+    import uvicorn
+
+    uvicorn.run(create_bench_app(args), host=args.host, port=args.port, log_level="warning")
+
+
+def _add_pool_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--pool-size", type=int, default=10, help="fake pool connections")
+    parser.add_argument(
+        "--query-latency",
+        type=float,
+        default=0.001,
+        help="seconds every fake query takes",
+    )
+    parser.add_argument(
+        "--latency-jitter",
+        type=float,
+        default=0.0,
+        help="uniform +/- spread of the query latency",
+    )
+    parser.add_argument(
+        "--cache",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="keep the /api/db_version response cache on (off measures the query path)",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m task1_fastapi.bench", description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run a benchmark and print JSON results")
+    run_parser.add_argument("--transport", choices=("asgi", "socket"), default="asgi")
+    run_parser.add_argument("--method", default="GET")
+    run_parser.add_argument("--path", default="/api/db_version")
+    run_parser.add_argument("--header", action="append", default=[], help="'Name: value'")
+    run_parser.add_argument("--body-file", type=Path, help="request body to send")
+    run_parser.add_argument("--concurrency", type=int, default=32)
+    run_parser.add_argument("--requests", type=int, default=10_000)
+    run_parser.add_argument("--duration", type=float, help="run for seconds instead")
+    run_parser.add_argument("--warmup", type=int, default=500, help="unmeasured requests")
+    run_parser.add_argument("--port", type=int, default=0, help="socket transport port")
+    run_parser.add_argument("--output", type=Path, help="also write the JSON report here")
+    _add_pool_arguments(run_parser)
+    run_parser.set_defaults(handler=run)
+
+    serve_parser = commands.add_parser("serve", help="serve the app with a fake pool")
+    serve_parser.add_argument("--port", type=int, default=8000)
+    _add_pool_arguments(serve_parser)
+    serve_parser.set_defaults(handler=serve)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = build_parser().parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Sequence
+
+from starlette.types import ASGIApp, Message
+
+Headers = Sequence[tuple[str, str]]
+
+
+class AsgiClient:
+    """Calls an ASGI app directly, with no HTTP parsing or sockets in the way."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self._app = app
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        body: bytes = b"",
+        headers: Headers = (),
+    ) -> int:
+        path, _, query = path.partition("?")
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0", "spec_version": "2.4"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": [
+                (b"host", b"bench"),
+                (b"content-length", str(len(body)).encode()),
+                *((name.lower().encode(), value.encode()) for name, value in headers),
+            ],
+            "client": ("127.0.0.1", 0),
+            "server": ("bench", 80),
+        }
+        request_sent = False
+        finished = asyncio.Event()
+        status = 0
+
+        async def receive() -> Message:
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            # Disconnect listeners wait here until the response has been sent.
+            await finished.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body" and not message.get("more_body"):
+                finished.set()
+
+        try:
+            await self._app(scope, receive, send)
+        finally:
+            finished.set()
+        return status
+
+
+class SocketClient:
+    """Minimal HTTP/1.1 keep-alive client: one connection per concurrent worker.
+
+    A hand-rolled client keeps client-side overhead low and avoids a dependency;
+    it understands ``Content-Length`` and chunked responses, which is all the
+    API produces.
+    """
+
+    def __init__(self, host: str, port: int) -> None:
+        self._host = host
+        self._port = port
+        self._idle: list[tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        body: bytes = b"",
+        headers: Headers = (),
+    ) -> int:
+        if self._idle:
+            reader, writer = self._idle.pop()
+        else:
+            reader, writer = await asyncio.open_connection(self._host, self._port)
+        try:
+            head = [
+                f"{method} {path} HTTP/1.1",
+                f"Host: {self._host}:{self._port}",
+                f"Content-Length: {len(body)}",
+                *(f"{name}: {value}" for name, value in headers),
+            ]
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+            status, keep_alive = await self._read_response(reader)
+        except BaseException:
+            writer.close()
+            raise
+        if keep_alive:
+            self._idle.append((reader, writer))
+        else:
+            writer.close()
+        return status
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
+        await asyncio.gather(*(writer.wait_closed() for _, writer in idle), return_exceptions=True)
+
+    @staticmethod
+    async def _read_response(reader: asyncio.StreamReader) -> tuple[int, bool]:
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("Server closed the connection")
+        status = int(status_line.split()[1])
+        headers: dict[str, str] = {}
+        while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        else:
+            await reader.readexactly(int(headers.get("content-length", "0")))
+        return status, headers.get("connection", "").lower() != "close"
@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import asyncio
+import random
+from collections.abc import Callable, Iterator, Mapping, Sequence
+from typing import Any
+
+from task1_fastapi.app.settings import PostgresSettings
+from task1_fastapi.app.statements import StatementRegistry
+
+LatencyFunction = Callable[[], float]
+RowsFunction = Callable[[str, tuple[Any, ...]], list[dict[str, Any]]]
+
+
+def fixed_latency(seconds: float, jitter: float = 0.0) -> LatencyFunction:
+    """Latency of ``seconds``, spread uniformly by up to ``jitter`` either way."""
+    if not jitter:
+        return lambda: seconds
+    return lambda: max(0.0, seconds + random.uniform(-jitter, jitter))
+
+
+def default_rows(query: str, args: tuple[Any, ...], *, count: int = 10) -> list[dict[str, Any]]:
+    if "version()" in query:
+        return [{"version": "PostgreSQL 16.0 (fake)"}]
+    if "pg_attribute" in query:
+        return []
+    return [{"name": f"row{index}", "setting": str(index)} for index in range(count)]
+
+
+class FakeRecord(Mapping[str, Any]):
+    """Read-only row with the parts of ``asyncpg.Record`` the app relies on."""
+
+    __slots__ = ("_data",)
+
+    def __init__(self, data: dict[str, Any]) -> None:
+        self._data = data
+
+    def __getitem__(self, key: str | int) -> Any:
+        if isinstance(key, int):
+            return list(self._data.values())[key]
+        return self._data[key]
+
+    def __iter__(self) -> Iterator[Any]:
+        # Like asyncpg.Record, iteration yields values; dict(record) goes through keys().
+        return iter(self._data.values())
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def keys(self) -> Any:
+        return self._data.keys()
+
+
+class FakeCursor:
+    def __init__(self, records: list[FakeRecord], latency: LatencyFunction) -> None:
+        self._records = records
+        self._latency = latency
+
+    async def fetch(self, n: int) -> list[FakeRecord]:
+        await asyncio.sleep(self._latency())
+        chunk, self._records = self._records[:n], self._records[n:]
+        return chunk
+
+
+class FakeStatement:
+    def __init__(self, connection: FakeConnection, query: str) -> None:
+        self._connection = connection
+        self._query = query
+
+    async def fetch(self, *args: Any) -> list[FakeRecord]:
+        return await self._connection.fetch(self._query, *args)
+
+    async def fetchrow(self, *args: Any) -> FakeRecord | None:
+        return await self._connection.fetchrow(self._query, *args)
+
+    async def fetchval(self, *args: Any) -> Any:
+        return await self._connection.fetchval(self._query, *args)
+
+    async def cursor(self, *args: Any) -> FakeCursor:
+        return FakeCursor(self._connection.records(self._query, args), self._connection.latency)
+
+
+class FakeTransaction:
+    async def start(self) -> None:
+        pass
+
+    async def commit(self) -> None:
+        pass
+
+    async def rollback(self) -> None:
+        pass
+
+    async def __aenter__(self) -> FakeTransaction:
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        pass
+
+
+class FakeConnection:
+    """Connection that answers every query with canned rows after an injected delay."""
+
+    def __init__(self, latency: LatencyFunction, rows: RowsFunction) -> None:
+        self.latency = latency
+        self._rows = rows
+        self._closed = False
+        self.named_statements: dict[str, Any] = {}
+
+    def records(self, query: str, args: tuple[Any, ...]) -> list[FakeRecord]:
+        return [FakeRecord(row) for row in self._rows(query, args)]
+
+    async def prepare(self, query: str) -> FakeStatement:
+        return FakeStatement(self, query)
+
+    async def execute(self, query: str, *args: Any, timeout: float | None = None) -> str:
+        await asyncio.sleep(self.latency())
+        return "SELECT 0"
+
+    async def fetch(self, query: str, *args: Any, timeout: float | None = None) -> list[FakeRecord]:
+        await asyncio.sleep(self.latency())
+        return self.records(query, args)
+
+    async def fetchrow(self, query: str, *args: Any, timeout: float | None = None) -> Any:
+        records = await self.fetch(query, *args)
+        return records[0] if records else None
+
+    async def fetchval(self, query: str, *args: Any, timeout: float | None = None) -> Any:
+        record = await self.fetchrow(query, *args)
+        return record[0] if record is not None else None
+
+    async def copy_records_to_table(self, table: str, *, records: Sequence[Any], **_: Any) -> str:
+        await asyncio.sleep(self.latency())
+        return f"COPY {len(records)}"
+
+    async def copy_to_table(self, table: str, **_: Any) -> str:
+        await asyncio.sleep(self.latency())
+        return "COPY 0"
+
+    async def set_type_codec(self, typename: str, **_: Any) -> None:
+        pass
+
+    def transaction(self, **_: Any) -> FakeTransaction:
+        return FakeTransaction()
+
+    def is_closed(self) -> bool:
+        return self._closed
+
+    def terminate(self) -> None:
+        self._closed = True
+
+
+class FakePool:
+    """Fixed-size pool of ``FakeConnection`` objects with ``asyncpg.Pool`` acquire semantics."""
+
+    def __init__(
+        self,
+        size: int,
+        *,
+        latency: LatencyFunction,
+        rows: RowsFunction = default_rows,
+    ) -> None:
+        self._size = size
+        self._connections = [FakeConnection(latency, rows) for _ in range(size)]
+        self._idle: asyncio.Queue[FakeConnection] = asyncio.Queue()
+        for connection in self._connections:
+            self._idle.put_nowait(connection)
+
+    async def prepare(self, statements: StatementRegistry) -> None:
+        for connection in self._connections:
+            await statements.prepare_connection(connection)
+
+    async def acquire(self, *, timeout: float | None = None) -> FakeConnection:
+        async with asyncio.timeout(timeout):
+            return await self._idle.get()
+
+    async def release(self, connection: FakeConnection, *, timeout: float | None = None) -> None:
+        self._idle.put_nowait(connection)
+
+    def get_size(self) -> int:
+        return self._size
+
+    def get_max_size(self) -> int:
+        return self._size
+
+    def get_idle_size(self) -> int:
+        return self._idle.qsize()
+
+    async def close(self) -> None:
+        self.terminate()
+
+    def terminate(self) -> None:
+        for connection in self._connections:
+            connection.terminate()
+
+
+def fake_pool_factory(
+    latency: LatencyFunction,
+    rows: RowsFunction = default_rows,
+) -> Callable[..., Any]:
+    """Build a drop-in replacement for ``create_pg_pool`` sized from the settings."""
+
+    async def create_fake_pool(
+        settings: PostgresSettings,
+        statements: StatementRegistry,
+        **_: Any,
+    ) -> FakePool:
+        pool = FakePool(settings.max_size, latency=latency, rows=rows)
+        await pool.prepare(statements)
+        return pool
+
+    return create_fake_pool
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+# One request: returns the HTTP status code.
+RequestFunction = Callable[[], Awaitable[int]]
+
+PERCENTILES: tuple[float, ...] = (50.0, 90.0, 99.0, 99.9)
+
+
+def percentile(sorted_values: list[float], percent: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(percent / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+@dataclass(slots=True)
+class LoadResult:
+    requests: int
+    seconds: float
+    latencies: list[float] = field(repr=False)
+    statuses: Counter[int]
+    errors: int
+
+    @property
+    def rps(self) -> float:
+        return self.requests / self.seconds if self.seconds > 0 else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        latencies = sorted(self.latencies)
+        latency_ms: dict[str, float] = {
+            f"p{percent:g}".replace(".", ""): round(percentile(latencies, percent) * 1000, 3)
+            for percent in PERCENTILES
+        }
+        if latencies:
+            latency_ms["mean"] = round(sum(latencies) / len(latencies) * 1000, 3)
+            latency_ms["max"] = round(latencies[-1] * 1000, 3)
+        return {
+            "requests": self.requests,
+            "seconds": round(self.seconds, 3),
+            "rps": round(self.rps, 1),
+            "latency_ms": latency_ms,
+            "statuses": {str(code): count for code, count in sorted(self.statuses.items())},
+            "errors": self.errors,
+        }
+
+
+async def run_load(
+    send: RequestFunction,
+    *,
+    concurrency: int,
+    requests: int | None = None,
+    duration: float | None = None,
+) -> LoadResult:
+    """Keep ``concurrency`` requests in flight until ``requests`` are sent or ``duration`` ends.
+
+    Each worker sends its next request as soon as the previous one finishes (a
+    closed loop), so latency is measured from send to the last response byte.
+    Exceptions count as errors; non-2xx/3xx answers are counted by status.
+    """
+    if requests is None and duration is None:
+        raise ValueError("Either requests or duration must be set")
+    latencies: list[float] = []
+    statuses: Counter[int] = Counter()
+    errors = 0
+    remaining = requests if requests is not None else math.inf
+    started = time.perf_counter()
+    deadline = started + duration if duration is not None else math.inf
+
+    async def worker() -> None:
+        nonlocal remaining, errors
+        while remaining > 0 and time.perf_counter() < deadline:
+            remaining -= 1
+            sent = time.perf_counter()
+            try:
+                status = await send()
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - sent)
+            statuses[status] += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return LoadResult(len(latencies) + errors, elapsed, latencies, statuses, errors)
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from collections.abc import AsyncIterator, Callable
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from task1_fastapi.app.main import create_app
+from task1_fastapi.bench.fake_pool import (
+    RowsFunction,
+    default_rows,
+    fake_pool_factory,
+    fixed_latency,
+)
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    # The app is built on asyncio primitives, so async tests never run under trio.
+    return "asyncio"
+
+
+@pytest.fixture
+def app_env(monkeypatch: pytest.MonkeyPatch) -> pytest.MonkeyPatch:
+    """Environment for an app on the fake pool; tests add their own settings to it."""
+    for name in ("DB_HOST", "DB_USER", "DB_PASSWORD", "DB_NAME"):
+        monkeypatch.setenv(name, "test")
+    monkeypatch.setenv("LOOP_MONITOR_ENABLED", "false")
+    return monkeypatch
+
+
+@pytest.fixture
+def make_app(app_env: pytest.MonkeyPatch) -> Callable[..., FastAPI]:
+    def make_app(rows: RowsFunction = default_rows, latency: float = 0.0) -> FastAPI:
+        return create_app(pool_factory=fake_pool_factory(fixed_latency(latency), rows))
+
+    return make_app
+
+
+@asynccontextmanager
+async def _serve(app: FastAPI) -> AsyncIterator[httpx.AsyncClient]:
+    async with app.router.lifespan_context(app):
+        # Unhandled errors become 500 responses, as they would behind uvicorn.
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            yield client
+
+
+@pytest.fixture
+def serve() -> Callable[[FastAPI], AbstractAsyncContextManager[httpx.AsyncClient]]:
+    """Run the app's lifespan and return an HTTP client for it."""
+    return _serve
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import pytest
+from task1_fastapi.app.autoscaler import PoolAutoscaler
+from task1_fastapi.app.pools import PoolCapacity
+
+
+def autoscaler(limit: int = 2, **kwargs: int) -> PoolAutoscaler:
+    return PoolAutoscaler(PoolCapacity(limit), min_size=2, max_size=8, **kwargs)
+
+
+def test_slow_acquires_double_the_limit_up_to_max_size() -> None:
+    scaler = autoscaler()
+    for expected in (4, 8, 8):
+        scaler.capacity.record_wait(0.1)
+        assert scaler.evaluate() == expected
+    assert scaler.capacity.limit == 8
+
+
+def test_full_utilization_counts_as_busy() -> None:
+    scaler = autoscaler()
+    scaler.capacity.window_peak = 2
+    assert scaler.evaluate() == 4
+
+
+def test_quiet_windows_shrink_one_step_at_a_time_down_to_min_size() -> None:
+    scaler = autoscaler(limit=4, scale_down_after=3)
+    assert [scaler.evaluate() for _ in range(3)] == [4, 4, 3]
+    assert [scaler.evaluate() for _ in range(6)] == [3, 3, 2, 2, 2, 2]
+
+
+def test_moderate_load_resets_the_quiet_streak() -> None:
+    scaler = autoscaler(limit=4, scale_down_after=2)
+    scaler.evaluate()
+    # 3 of 4 connections in use is neither busy nor quiet.
+    scaler.capacity.window_peak = 3
+    scaler.evaluate()
+    assert scaler.evaluate() == 4
+    assert scaler.evaluate() == 3
+
+
+def test_limit_is_clamped_to_the_configured_range() -> None:
+    assert autoscaler(limit=1).capacity.limit == 2
+    assert autoscaler(limit=20).capacity.limit == 8
+    with pytest.raises(ValueError):
+        PoolAutoscaler(PoolCapacity(1), min_size=4, max_size=2)
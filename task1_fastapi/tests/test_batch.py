@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from contextlib import AbstractAsyncContextManager
+from datetime import date
+from decimal import Decimal
+from typing import Any
+
+import asyncpg
+import httpx
+import pytest
+from fastapi import FastAPI
+from task1_fastapi.bench.fake_pool import FakePool, default_rows
+
+pytestmark = pytest.mark.anyio
+
+ServeFunction = Callable[[FastAPI], AbstractAsyncContextManager[httpx.AsyncClient]]
+
+
+def rows(query: str, args: tuple[Any, ...]) -> list[dict[str, Any]]:
+    if args:
+        raise asyncpg.DataError("the server expects 0 arguments for this query, got 1")
+    if "pg_settings" in query:
+        return [{"name": "work_mem", "setting": Decimal("4.5"), "since": date(2026, 1, 2)}]
+    return default_rows(query, args)
+
+
+async def test_queries_run_in_order_with_errors_reported_in_place(
+    make_app: Callable[..., FastAPI], serve: ServeFunction
+) -> None:
+    batch = {
+        "queries": [
+            {"name": "db_version"},
+            {"name": "pg_settings", "params": [1]},
+            {"name": "pg_settings"},
+        ]
+    }
+    app = make_app(rows)
+    async with serve(app) as client:
+        response = await client.post("/api/batch", json=batch)
+        assert app.state.pg_pool.get_idle_size() == app.state.pg_pool.get_size()
+    assert response.status_code == 200
+    first, second, third = response.json()["results"]
+    assert first == {"name": "db_version", "rows": [{"version": "PostgreSQL 16.0 (fake)"}]}
+    assert second["name"] == "pg_settings"
+    assert "expects 0 arguments" in second["error"]
+    # Values without a JSON form are encoded as strings.
+    assert third["rows"] == [{"name": "work_mem", "setting": "4.5", "since": "2026-01-02"}]
+
+
+@pytest.mark.parametrize(
+    ("queries", "status_code"),
+    [
+        ([{"name": "unknown"}], 404),
+        ([{"name": "db_version"}] * 3, 422),
+    ],
+)
+async def test_invalid_batches_are_rejected(
+    app_env: pytest.MonkeyPatch,
+    make_app: Callable[..., FastAPI],
+    serve: ServeFunction,
+    queries: list[dict[str, Any]],
+    status_code: int,
+) -> None:
+    app_env.setenv("BATCH_MAX_QUERIES", "2")
+    acquired = 0
+    acquire = FakePool.acquire
+
+    async def counting_acquire(self: FakePool, **kwargs: Any) -> Any:
+        nonlocal acquired
+        acquired += 1
+        return await acquire(self, **kwargs)
+
+    app_env.setattr(FakePool, "acquire", counting_acquire)
+    async with serve(make_app()) as client:
+        response = await client.post("/api/batch", json={"queries": queries})
+    assert response.status_code == status_code
+    # Rejected before the first query, so no connection was taken.
+    assert acquired == 0
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from contextlib import AbstractAsyncContextManager
+from typing import Any
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from task1_fastapi.app.breaker import CircuitBreaker, CircuitOpenError, CircuitState
+from task1_fastapi.bench.fake_pool import default_rows
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def breaker(clock: FakeClock) -> CircuitBreaker:
+    return CircuitBreaker(failure_threshold=3, reset_timeout=10.0, clock=clock)
+
+
+def trip(breaker: CircuitBreaker) -> None:
+    for _ in range(3):
+        breaker.before_call()
+        breaker.record_failure()
+
+
+def test_opens_after_consecutive_failures(breaker: CircuitBreaker) -> None:
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state is CircuitState.CLOSED
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state is CircuitState.OPEN
+    assert breaker.times_opened == 1
+
+
+def test_success_resets_the_failure_count(breaker: CircuitBreaker) -> None:
+    for _ in range(2):
+        breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state is CircuitState.CLOSED
+
+
+def test_open_circuit_fails_fast_with_remaining_cooldown(
+    breaker: CircuitBreaker, clock: FakeClock
+) -> None:
+    trip(breaker)
+    clock.now = 6.5
+    with pytest.raises(CircuitOpenError) as info:
+        breaker.before_call()
+    assert info.value.retry_after == 4
+    assert breaker.rejected == 1
+
+
+def test_half_open_limits_probes_and_closes_on_success(
+    breaker: CircuitBreaker, clock: FakeClock
+) -> None:
+    trip(breaker)
+    clock.now = 10.0
+    breaker.before_call()
+    assert breaker.state is CircuitState.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state is CircuitState.CLOSED
+    breaker.before_call()
+
+
+def test_failed_probe_reopens_the_circuit(breaker: CircuitBreaker, clock: FakeClock) -> None:
+    trip(breaker)
+    clock.now = 10.0
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state is CircuitState.OPEN
+    assert breaker.opened_at == 10.0
+    assert breaker.times_opened == 2
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_neutral_probe_frees_its_slot(breaker: CircuitBreaker, clock: FakeClock) -> None:
+    trip(breaker)
+    clock.now = 10.0
+    breaker.before_call()
+    breaker.record_neutral()
+    assert breaker.state is CircuitState.HALF_OPEN
+    breaker.before_call()
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [{"failure_threshold": 0}, {"reset_timeout": 0}, {"half_open_max_calls": 0}],
+)
+def test_rejects_invalid_settings(kwargs: dict[str, float]) -> None:
+    with pytest.raises(ValueError):
+        CircuitBreaker(**kwargs)
+
+
+def reset_by_peer(query: str, args: tuple[Any, ...]) -> list[dict[str, Any]]:
+    if "version()" in query:
+        raise ConnectionResetError("connection reset by peer")
+    return default_rows(query, args)
+
+
+BATCH = {"queries": [{"name": "db_version"}]}
+
+
+@pytest.mark.anyio
+async def test_lazy_route_failures_open_the_breaker(
+    app_env: pytest.MonkeyPatch,
+    make_app: Callable[..., FastAPI],
+    serve: Callable[[FastAPI], AbstractAsyncContextManager[httpx.AsyncClient]],
+) -> None:
+    app_env.setenv("DB_BREAKER_FAILURE_THRESHOLD", "3")
+    app = make_app(reset_by_peer)
+    async with serve(app) as client:
+        for _ in range(3):
+            response = await client.post("/api/batch", json=BATCH)
+            assert response.status_code == 500
+        breaker: CircuitBreaker = app.state.pg_breaker
+        assert breaker.state is CircuitState.OPEN
+        response = await client.post("/api/batch", json=BATCH)
+        assert response.status_code == 503
+
+
+@pytest.mark.anyio
+async def test_failed_lazy_probe_keeps_the_circuit_open(
+    app_env: pytest.MonkeyPatch,
+    make_app: Callable[..., FastAPI],
+    serve: Callable[[FastAPI], AbstractAsyncContextManager[httpx.AsyncClient]],
+) -> None:
+    app_env.setenv("DB_BREAKER_FAILURE_THRESHOLD", "1")
+    app = make_app(reset_by_peer)
+    async with serve(app) as client:
+        breaker: CircuitBreaker = app.state.pg_breaker
+        assert (await client.post("/api/batch", json=BATCH)).status_code == 500
+        breaker.opened_at -= breaker._reset_timeout
+        assert (await client.post("/api/batch", json=BATCH)).status_code == 500
+        assert breaker.state is CircuitState.OPEN
+        assert breaker.times_opened == 2
+
+
+@pytest.mark.anyio
+async def test_successful_lazy_route_closes_a_half_open_circuit(
+    app_env: pytest.MonkeyPatch,
+    make_app: Callable[..., FastAPI],
+    serve: Callable[[FastAPI], AbstractAsyncContextManager[httpx.AsyncClient]],
+) -> None:
+    app_env.setenv("DB_BREAKER_FAILURE_THRESHOLD", "1")
+    app = make_app()
+    async with serve(app) as client:
+        breaker: CircuitBreaker = app.state.pg_breaker
+        breaker.record_failure()
+        breaker.opened_at -= breaker._reset_timeout
+        assert (await client.post("/api/batch", json=BATCH)).status_code == 200
+        assert breaker.state is CircuitState.CLOSED
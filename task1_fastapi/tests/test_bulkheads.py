@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from collections.abc import Callable
+from contextlib import AbstractAsyncContextManager
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from pydantic import ValidationError
+from task1_fastapi.app.pools import Bulkheads, PoolSaturatedError
+from task1_fastapi.app.settings import PostgresSettings
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_class_cannot_hold_more_than_its_quota() -> None:
+    bulkheads = Bulkheads({"heavy": 1}, timeout=0.01, retry_after=2)
+    async with bulkheads.hold("heavy"):
+        with pytest.raises(PoolSaturatedError) as info:
+            async with bulkheads.hold("heavy"):
+                pass
+        # Classes without a quota are not limited.
+        async with bulkheads.hold("fast"), bulkheads.hold("fast"):
+            pass
+    assert (info.value.reason, info.value.retry_after) == ("bulkhead_heavy", 2)
+    assert bulkheads.rejected == {"heavy": 1}
+    async with bulkheads.hold("heavy"):
+        pass
+
+
+async def test_waiting_request_gets_the_slot_when_it_is_released() -> None:
+    bulkheads = Bulkheads({"heavy": 1})
+    order: list[str] = []
+
+    async def hold(name: str, seconds: float) -> None:
+        async with bulkheads.hold("heavy"):
+            order.append(name)
+            await asyncio.sleep(seconds)
+
+    await asyncio.gather(hold("first", 0.01), hold("second", 0.0))
+    assert order == ["first", "second"]
+
+
+def test_quotas_are_validated_and_split_across_workers(app_env: pytest.MonkeyPatch) -> None:
+    app_env.setenv("DB_POOL_MAX_SIZE", "8")
+    app_env.setenv("DB_BULKHEADS", json.dumps({"heavy": 9}))
+    with pytest.raises(ValidationError):
+        PostgresSettings()
+    app_env.setenv("DB_BULKHEADS", json.dumps({"heavy": 6}))
+    assert PostgresSettings().for_workers(4).bulkheads == {"heavy": 1}
+
+
+async def test_heavy_routes_are_shed_while_fast_routes_keep_working(
+    app_env: pytest.MonkeyPatch,
+    make_app: Callable[..., FastAPI],
+    serve: Callable[[FastAPI], AbstractAsyncContextManager[httpx.AsyncClient]],
+) -> None:
+    app_env.setenv("DB_POOL_MAX_SIZE", "4")
+    app_env.setenv("DB_BULKHEADS", json.dumps({"heavy": 1}))
+    app_env.setenv("DB_POOL_ACQUIRE_TIMEOUT", "0.05")
+    app_env.setenv("DB_POOL_RETRY_AFTER", "3")
+    app_env.setenv("CACHE_DB_VERSION_TTL", "0")
+    batch = {"queries": [{"name": "pg_settings"}]}
+    async with serve(make_app(latency=0.3)) as client:
+        heavy = [asyncio.create_task(client.post("/api/batch", json=batch)) for _ in range(2)]
+        await asyncio.sleep(0.02)
+        fast = await client.get("/api/db_version")
+        responses = await asyncio.gather(*heavy)
+    assert fast.status_code == 200
+    assert sorted(response.status_code for response in responses) == [200, 503]
+    shed = next(response for response in responses if response.status_code == 503)
+    assert shed.headers["retry-after"] == "3"
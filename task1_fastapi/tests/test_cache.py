@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from task1_fastapi.app.cache import TTLCache
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class Loader:
+    def __init__(self, value: str = "value") -> None:
+        self.value = value
+        self.calls = 0
+        self.cancelled = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self) -> str:
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return self.value
+
+
+async def test_entries_expire_after_ttl() -> None:
+    clock = FakeClock()
+    cache: TTLCache[str] = TTLCache(10, clock=clock)
+    cache.set("key", "value")
+    clock.now = 9.9
+    assert cache.get("key") == "value"
+    clock.now = 10.0
+    assert cache.get("key") is None
+
+
+async def test_concurrent_misses_share_one_load() -> None:
+    cache: TTLCache[str] = TTLCache(10)
+    loader = Loader()
+    callers = [asyncio.create_task(cache.get_or_load("key", loader)) for _ in range(5)]
+    await asyncio.sleep(0)
+    loader.release.set()
+    assert await asyncio.gather(*callers) == ["value"] * 5
+    assert loader.calls == 1
+    assert await cache.get_or_load("key", loader) == "value"
+    assert loader.calls == 1
+
+
+async def test_failed_load_reaches_every_waiter_and_is_not_cached() -> None:
+    cache: TTLCache[str] = TTLCache(10)
+    calls = 0
+
+    async def failing() -> str:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0)
+        raise RuntimeError("boom")
+
+    results = await asyncio.gather(
+        cache.get_or_load("key", failing),
+        cache.get_or_load("key", failing),
+        return_exceptions=True,
+    )
+    assert [type(result) for result in results] == [RuntimeError, RuntimeError]
+    assert calls == 1
+    assert cache.get("key") is None
+
+
+async def test_cancelled_caller_does_not_abort_load_for_others() -> None:
+    cache: TTLCache[str] = TTLCache(10)
+    loader = Loader()
+    first = asyncio.create_task(cache.get_or_load("key", loader))
+    second = asyncio.create_task(cache.get_or_load("key", loader))
+    await asyncio.sleep(0)
+    first.cancel()
+    await asyncio.sleep(0)
+    loader.release.set()
+    assert await second == "value"
+    assert first.cancelled()
+    assert loader.cancelled == 0
+    assert cache.get("key") == "value"
+
+
+async def test_load_is_cancelled_with_its_last_caller() -> None:
+    cache: TTLCache[str] = TTLCache(10)
+    loader = Loader()
+    callers = [asyncio.create_task(cache.get_or_load("key", loader)) for _ in range(2)]
+    await asyncio.sleep(0)
+    for caller in callers:
+        caller.cancel()
+    await asyncio.gather(*callers, return_exceptions=True)
+    await asyncio.sleep(0)
+    assert loader.cancelled == 1
+    assert cache.get("key") is None
+
+    loader.release.set()
+    assert await cache.get_or_load("key", loader) == "value"
+    assert loader.calls == 2
+
+
+async def test_new_caller_does_not_join_a_load_being_cancelled() -> None:
+    cache: TTLCache[str] = TTLCache(10)
+    unwinding = asyncio.Event()
+    finish_unwinding = asyncio.Event()
+
+    async def slow_to_cancel() -> str:
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            # Like a query sending its cancel request to the server before giving up.
+            unwinding.set()
+            await finish_unwinding.wait()
+            raise
+        return "never"
+
+    first = asyncio.create_task(cache.get_or_load("key", slow_to_cancel))
+    await asyncio.sleep(0)
+    first.cancel()
+    await unwinding.wait()
+
+    fresh = Loader("fresh")
+    fresh.release.set()
+    second = asyncio.create_task(cache.get_or_load("key", fresh))
+    await asyncio.sleep(0)
+    finish_unwinding.set()
+    assert await second == "fresh"
+    assert first.cancelled()
+    assert cache.get("key") == "fresh"
+
+
+async def test_load_invalidated_in_flight_is_not_stored() -> None:
+    cache: TTLCache[str] = TTLCache(10)
+    loader = Loader("stale")
+    caller = asyncio.create_task(cache.get_or_load("key", loader))
+    await asyncio.sleep(0)
+    generation = cache.generation
+    cache.invalidate("key")
+    assert cache.generation != generation
+    loader.release.set()
+    assert await caller == "stale"
+    assert cache.get("key") is None
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import uuid
+from collections.abc import Callable
+from contextlib import AbstractAsyncContextManager
+from typing import Any
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from task1_fastapi.app.type_codecs import CodecRegistry
+
+pytestmark = pytest.mark.anyio
+
+
+class CodecConnection:
+    """Records the codecs set on it; types listed in ``missing`` do not exist."""
+
+    def __init__(self, missing: tuple[str, ...] = ()) -> None:
+        self.missing = missing
+        self.codecs: dict[str, dict[str, Any]] = {}
+
+    async def set_type_codec(self, typename: str, **options: Any) -> None:
+        if typename in self.missing:
+            raise ValueError(f"unknown type: {options['schema']}.{typename}")
+        self.codecs[typename] = options
+
+
+async def applied(codecs: CodecRegistry, *missing: str) -> dict[str, dict[str, Any]]:
+    connection = CodecConnection(missing)
+    await codecs.apply(connection)  # type: ignore[arg-type]
+    return connection.codecs
+
+
+async def test_json_codecs_round_trip() -> None:
+    codecs = CodecRegistry()
+    codecs.register_json()
+    installed = await applied(codecs)
+    assert {name: options["format"] for name, options in installed.items()} == {
+        "jsonb": "binary",
+        "json": "binary",
+    }
+    value = {"name": "work_mem", "values": [1, 2.5, None]}
+    for options in installed.values():
+        assert options["decoder"](options["encoder"](value)) == value
+    with pytest.raises(ValueError, match="jsonb format version"):
+        installed["jsonb"]["decoder"](b"\x02{}")
+
+
+async def test_opt_in_codecs_skip_python_objects() -> None:
+    codecs = CodecRegistry()
+    codecs.register_numeric_as_float()
+    codecs.register_uuid_as_text()
+    installed = await applied(codecs)
+    assert installed["numeric"]["decoder"]("4.50") == 4.5
+    value = str(uuid.uuid4())
+    assert installed["uuid"]["decoder"](value) == value
+
+
+def test_conflicting_registration_is_rejected() -> None:
+    codecs = CodecRegistry()
+    codecs.register_json()
+    # Registering the same codec again is harmless, e.g. when the lifespan runs twice.
+    codecs.register_json()
+    with pytest.raises(ValueError, match="already registered"):
+        codecs.register("jsonb", encoder=str, decoder=str, schema="pg_catalog")
+
+
+async def test_unknown_types_are_skipped() -> None:
+    codecs = CodecRegistry()
+    codecs.register("hstore", encoder=str, decoder=str)
+    codecs.register_uuid_as_text()
+    assert list(await applied(codecs, "hstore")) == ["uuid"]
+
+
+async def test_codecs_follow_settings(
+    app_env: pytest.MonkeyPatch,
+    make_app: Callable[..., FastAPI],
+    serve: Callable[[FastAPI], AbstractAsyncContextManager[httpx.AsyncClient]],
+) -> None:
+    app_env.setenv("DB_JSON_CODECS", "false")
+    app_env.setenv("DB_NUMERIC_AS_FLOAT", "true")
+    app = make_app()
+    async with serve(app):
+        installed = await applied(app.state.codecs)
+    assert list(installed) == ["numeric"]
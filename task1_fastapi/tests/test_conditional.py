@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from contextlib import AbstractAsyncContextManager
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from task1_fastapi.app.conditional import CachedBody, cache_control
+
+
+def test_etag_is_stable_and_depends_on_the_body() -> None:
+    first = CachedBody.from_body(b'{"version":"16"}')
+    assert first == CachedBody.from_body(b'{"version":"16"}')
+    assert first.etag != CachedBody.from_body(b'{"version":"17"}').etag
+    assert first.etag.startswith('"') and first.etag.endswith('"')
+
+
+def test_cache_control() -> None:
+    assert cache_control(30) == "max-age=30"
+    assert cache_control(0) == "no-cache"
+
+
+@pytest.mark.anyio
+async def test_db_version_answers_304_for_a_matching_etag(
+    app_env: pytest.MonkeyPatch,
+    make_app: Callable[..., FastAPI],
+    serve: Callable[[FastAPI], AbstractAsyncContextManager[httpx.AsyncClient]],
+) -> None:
+    app_env.setenv("CACHE_DB_VERSION_MAX_AGE", "15")
+    async with serve(make_app()) as client:
+        response = await client.get("/api/db_version")
+        assert response.status_code == 200
+        assert response.json() == {"version": "PostgreSQL 16.0 (fake)"}
+        etag = response.headers["etag"]
+        assert response.headers["cache-control"] == "max-age=15"
+
+        for header in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+            response = await client.get("/api/db_version", headers={"If-None-Match": header})
+            assert response.status_code == 304
+            assert response.content == b""
+            assert response.headers["etag"] == etag
+
+        response = await client.get("/api/db_version", headers={"If-None-Match": '"other"'})
+        assert response.status_code == 200
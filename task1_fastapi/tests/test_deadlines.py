@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from collections.abc import Callable
+from contextlib import AbstractAsyncContextManager
+from types import SimpleNamespace
+from typing import Any
+
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException, Request, Response
+from task1_fastapi.app.deadlines import CLIENT_CLOSED_REQUEST, run_cancellable
+from task1_fastapi.app.settings import DeadlineSettings
+
+pytestmark = pytest.mark.anyio
+
+
+def make_request(receive: Callable[[], Any]) -> Request:
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/api/slow",
+        "query_string": b"",
+        "headers": [],
+        "app": SimpleNamespace(state=SimpleNamespace()),
+    }
+    return Request(scope, receive)
+
+
+async def never_disconnects() -> dict[str, Any]:
+    await asyncio.Event().wait()
+    return {}
+
+
+class Handler:
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+        self.cancelled = False
+
+    async def __call__(self) -> Response:
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return Response(b"done")
+
+
+async def test_handler_finishing_in_time_returns_its_response() -> None:
+    handler = Handler(0.0)
+    response = await run_cancellable(
+        make_request(never_disconnects),
+        handler(),
+        route="slow",
+        deadline=1.0,
+        watch_disconnect=True,
+    )
+    assert response.body == b"done"
+
+
+async def test_deadline_cancels_the_handler_with_504() -> None:
+    handler = Handler(10.0)
+    with pytest.raises(HTTPException) as info:
+        await run_cancellable(
+            make_request(never_disconnects),
+            handler(),
+            route="slow",
+            deadline=0.01,
+            watch_disconnect=False,
+        )
+    assert info.value.status_code == 504
+    assert handler.cancelled
+
+
+async def test_client_disconnect_cancels_the_handler() -> None:
+    async def disconnects() -> dict[str, Any]:
+        await asyncio.sleep(0.01)
+        return {"type": "http.disconnect"}
+
+    handler = Handler(10.0)
+    response = await run_cancellable(
+        make_request(disconnects),
+        handler(),
+        route="slow",
+        deadline=None,
+        watch_disconnect=True,
+    )
+    assert response.status_code == CLIENT_CLOSED_REQUEST
+    assert handler.cancelled
+
+
+def test_route_deadlines_override_the_default(app_env: pytest.MonkeyPatch) -> None:
+    app_env.setenv("REQUEST_DEADLINE", "5")
+    app_env.setenv("REQUEST_DEADLINES", json.dumps({"db_version": 0.5}))
+    app_env.setenv("REQUEST_CANCEL_ON_DISCONNECT", json.dumps(["export_query"]))
+    settings = DeadlineSettings()
+    assert settings.for_route("db_version") == 0.5
+    assert settings.for_route("batch_queries") == 5
+    assert settings.cancels_on_disconnect("export_query")
+
+    app_env.delenv("REQUEST_DEADLINE")
+    settings = DeadlineSettings()
+    assert not settings.cancels_on_disconnect("batch_queries")
+
+
+async def test_slow_query_is_cancelled_at_the_route_deadline(
+    app_env: pytest.MonkeyPatch,
+    make_app: Callable[..., FastAPI],
+    serve: Callable[[FastAPI], AbstractAsyncContextManager[httpx.AsyncClient]],
+) -> None:
+    app_env.setenv("REQUEST_DEADLINES", json.dumps({"db_version": 0.05}))
+    app = make_app(latency=5.0)
+    async with serve(app) as client:
+        started = time.perf_counter()
+        response = await client.get("/api/db_version")
+        assert response.status_code == 504
+        assert time.perf_counter() - started < 2.0
+        # The query was cancelled and its connection is back in the pool.
+        assert app.state.pg_pool.get_idle_size() == app.state.pg_pool.get_size()
+        metrics = (await client.get("/metrics")).text
+    assert 'route="db_version",reason="deadline"} 1' in metrics
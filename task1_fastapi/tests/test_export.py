@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+from collections.abc import Callable
+from contextlib import AbstractAsyncContextManager
+from typing import Any
+
+import asyncpg
+import httpx
+import pytest
+from fastapi import FastAPI
+from task1_fastapi.bench.fake_pool import default_rows
+
+pytestmark = pytest.mark.anyio
+
+ServeFunction = Callable[[FastAPI], AbstractAsyncContextManager[httpx.AsyncClient]]
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(app_env: pytest.MonkeyPatch) -> None:
+    app_env.setenv("EXPORT_CHUNK_SIZE", "3")
+
+
+async def test_ndjson_export_streams_every_row(
+    make_app: Callable[..., FastAPI], serve: ServeFunction
+) -> None:
+    app = make_app()
+    async with serve(app) as client:
+        response = await client.get("/api/export/pg_settings")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.headers["content-disposition"] == 'attachment; filename="pg_settings.ndjson"'
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert rows == default_rows("", ())
+
+
+async def test_csv_export_writes_one_header(
+    make_app: Callable[..., FastAPI], serve: ServeFunction
+) -> None:
+    async with serve(make_app()) as client:
+        response = await client.get("/api/export/pg_settings", params={"format": "csv"})
+    assert response.headers["content-type"] == "text/csv; charset=utf-8"
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == ["name", "setting"]
+    assert rows[1:] == [[row["name"], row["setting"]] for row in default_rows("", ())]
+
+
+async def test_empty_result_is_an_empty_body(
+    make_app: Callable[..., FastAPI], serve: ServeFunction
+) -> None:
+    async with serve(make_app(lambda query, args: [])) as client:
+        response = await client.get("/api/export/pg_settings")
+    assert response.status_code == 200
+    assert response.content == b""
+
+
+async def test_unknown_export(make_app: Callable[..., FastAPI], serve: ServeFunction) -> None:
+    async with serve(make_app()) as client:
+        response = await client.get("/api/export/db_version")
+    assert response.status_code == 404
+
+
+async def test_query_error_before_streaming_is_a_500(
+    make_app: Callable[..., FastAPI], serve: ServeFunction
+) -> None:
+    def failing(query: str, args: tuple[Any, ...]) -> list[dict[str, Any]]:
+        raise asyncpg.UndefinedTableError("relation does not exist")
+
+    app = make_app(failing)
+    async with serve(app) as client:
+        response = await client.get("/api/export/pg_settings")
+        assert response.status_code == 500
+        # The connection went back to the pool.
+        assert app.state.pg_pool.get_idle_size() == app.state.pg_pool.get_size()
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import json
+from collections.abc import AsyncIterator, Callable
+from contextlib import AbstractAsyncContextManager
+from datetime import UTC, datetime
+from typing import Any
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from task1_fastapi.app.ingest import IngestError, iter_lines
+from task1_fastapi.bench.fake_pool import FakeConnection, default_rows
+
+pytestmark = pytest.mark.anyio
+
+
+async def chunks(*parts: bytes) -> AsyncIterator[bytes]:
+    for part in parts:
+        yield part
+
+
+async def lines(*parts: bytes, quoted: bool = False) -> list[bytes]:
+    return [line async for line in iter_lines(chunks(*parts), quoted=quoted)]
+
+
+async def test_lines_split_across_chunks() -> None:
+    assert await lines(b'{"a": 1}\n{"a"', b": 2}\n", b'{"a": 3}') == [
+        b'{"a": 1}',
+        b'{"a": 2}',
+        b'{"a": 3}',
+    ]
+
+
+async def test_blank_lines_are_skipped() -> None:
+    assert await lines(b"one\n\n  \n", b"\ntwo\n\n") == [b"one", b"two"]
+
+
+async def test_empty_body_yields_nothing() -> None:
+    assert await lines() == []
+    assert await lines(b"", b"\n") == []
+
+
+async def test_quoted_newlines_stay_in_the_field() -> None:
+    body = (b'id,note\n1,"first\n', b'line"\n2,"say ""hi""\nthere"\n3,plain')
+    assert await lines(*body, quoted=True) == [
+        b"id,note",
+        b'1,"first\nline"',
+        b'2,"say ""hi""\nthere"',
+        b"3,plain",
+    ]
+
+
+async def test_quotes_are_ignored_unless_quoted() -> None:
+    assert await lines(b'a"\nb\n') == [b'a"', b"b"]
+
+
+async def test_unterminated_quote_is_rejected() -> None:
+    with pytest.raises(IngestError):
+        await lines(b'1,"open\n', b"still open\n", quoted=True)
+
+
+ServeFunction = Callable[[FastAPI], AbstractAsyncContextManager[httpx.AsyncClient]]
+
+
+def event_rows(query: str, args: tuple[Any, ...]) -> list[dict[str, Any]]:
+    if "pg_attribute" in query:
+        return [
+            {"attname": "id", "typname": "int8"},
+            {"attname": "created_at", "typname": "timestamptz"},
+        ]
+    return default_rows(query, args)
+
+
+@pytest.fixture
+def copies(app_env: pytest.MonkeyPatch) -> list[Any]:
+    """Configure an ``events`` target and record what each COPY receives."""
+    app_env.setenv("INGEST_TABLES", json.dumps({"events": ["id", "created_at"]}))
+    app_env.setenv("INGEST_BATCH_SIZE", "2")
+    copied: list[Any] = []
+
+    async def copy_records_to_table(
+        self: FakeConnection, table: str, *, records: list[Any], **_: Any
+    ) -> str:
+        copied.append(records)
+        return f"COPY {len(records)}"
+
+    async def copy_to_table(self: FakeConnection, table: str, *, source: Any, **kwargs: Any) -> str:
+        copied.append((kwargs["columns"], source.read()))
+        return "COPY"
+
+    app_env.setattr(FakeConnection, "copy_records_to_table", copy_records_to_table)
+    app_env.setattr(FakeConnection, "copy_to_table", copy_to_table)
+    return copied
+
+
+async def test_ndjson_is_copied_in_batches_with_parsed_timestamps(
+    copies: list[Any], make_app: Callable[..., FastAPI], serve: ServeFunction
+) -> None:
+    body = b"".join(
+        b'{"id": %d, "created_at": "2026-01-0%dT12:00:00+00:00"}\n' % (index, index)
+        for index in range(1, 6)
+    )
+    async with serve(make_app(event_rows)) as client:
+        response = await client.post("/api/ingest/events", content=body)
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["target"], result["rows"], len(result["batches"])) == ("events", 5, 3)
+    assert [len(batch) for batch in copies] == [2, 2, 1]
+    assert copies[0][0] == (1, datetime(2026, 1, 1, 12, tzinfo=UTC))
+
+
+async def test_csv_rows_are_passed_through(
+    copies: list[Any], make_app: Callable[..., FastAPI], serve: ServeFunction
+) -> None:
+    body = b'created_at,id\n2026-01-01,1\n"2026-01-02",2\n2026-01-03,3\n'
+    async with serve(make_app(event_rows)) as client:
+        response = await client.post("/api/ingest/events", params={"format": "csv"}, content=body)
+    assert response.json()["rows"] == 3
+    assert copies == [
+        (["created_at", "id"], b'2026-01-01,1\n"2026-01-02",2\n'),
+        (["created_at", "id"], b"2026-01-03,3\n"),
+    ]
+
+
+@pytest.mark.parametrize(
+    ("body", "status_code"),
+    [
+        (b'{"id": 1}\nnot json\n', 400),
+        (b'{"id": 1, "extra": true}\n', 400),
+        (b'{"id": 1, "created_at": "yesterday"}\n', 422),
+    ],
+)
+async def test_bad_rows_are_rejected(
+    copies: list[Any],
+    make_app: Callable[..., FastAPI],
+    serve: ServeFunction,
+    body: bytes,
+    status_code: int,
+) -> None:
+    async with serve(make_app(event_rows)) as client:
+        response = await client.post("/api/ingest/events", content=body)
+    assert response.status_code == status_code
+
+
+async def test_unknown_target(
+    copies: list[Any], make_app: Callable[..., FastAPI], serve: ServeFunction
+) -> None:
+    async with serve(make_app(event_rows)) as client:
+        response = await client.post("/api/ingest/nope", content=b'{"id": 1}\n')
+    assert response.status_code == 404
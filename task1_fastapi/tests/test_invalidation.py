@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from typing import Any
+
+import pytest
+from task1_fastapi.app.invalidation import CacheInvalidator
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeListenerConnection:
+    def __init__(self) -> None:
+        self.listeners: dict[str, Callable[..., Any]] = {}
+        self.on_termination: list[Callable[[Any], object]] = []
+        self.terminated = False
+
+    def add_termination_listener(self, callback: Callable[[Any], object]) -> None:
+        self.on_termination.append(callback)
+
+    async def add_listener(self, channel: str, callback: Callable[..., Any]) -> None:
+        self.listeners[channel] = callback
+
+    def notify(self, channel: str, payload: str = "") -> None:
+        self.listeners[channel](self, 1, channel, payload)
+
+    def lose(self) -> None:
+        for callback in self.on_termination:
+            callback(self)
+
+    def terminate(self) -> None:
+        self.terminated = True
+
+
+class Connector:
+    def __init__(self, failures: int = 0) -> None:
+        self.failures = failures
+        self.connections: list[FakeListenerConnection] = []
+
+    async def __call__(self) -> FakeListenerConnection:
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionRefusedError("connection refused")
+        self.connections.append(FakeListenerConnection())
+        return self.connections[-1]
+
+
+async def wait_until(condition: Callable[[], bool]) -> None:
+    for _ in range(200):
+        if condition():
+            return
+        await asyncio.sleep(0.005)
+    raise AssertionError("condition was not met")
+
+
+async def test_notification_evicts_channel_keys_and_payload() -> None:
+    connect = Connector()
+    invalidator = CacheInvalidator(connect, {"settings_changed": ["db_version"]})
+    evicted: list[str] = []
+    invalidator.add_target(evicted.append)
+    invalidator.start()
+    try:
+        await wait_until(lambda: invalidator.connected)
+        # Whatever changed before LISTEN was issued is evicted on connect.
+        assert evicted == ["db_version"]
+        evicted.clear()
+        connection = connect.connections[0]
+        connection.notify("settings_changed")
+        connection.notify("settings_changed", "pg_settings")
+    finally:
+        await invalidator.close()
+    assert evicted == ["db_version", "db_version", "pg_settings"]
+    assert invalidator.notifications == {"settings_changed": 2}
+    assert connection.terminated
+
+
+async def test_listener_reconnects_and_evicts_everything_again() -> None:
+    connect = Connector(failures=2)
+    invalidator = CacheInvalidator(connect, {"a": ["one"], "b": ["two"]}, reconnect_interval=0.001)
+    evicted: list[str] = []
+    invalidator.add_target(evicted.append)
+    invalidator.start()
+    try:
+        await wait_until(lambda: invalidator.connected)
+        assert sorted(evicted) == ["one", "two"]
+        connect.connections[0].lose()
+        await wait_until(lambda: len(connect.connections) == 2 and invalidator.connected)
+    finally:
+        await invalidator.close()
+    assert connect.connections[0].terminated
+    assert sorted(evicted) == ["one", "one", "two", "two"]
+
+
+async def test_failing_target_does_not_stop_the_others() -> None:
+    invalidator = CacheInvalidator(Connector(), {"a": ["one"]})
+    evicted: list[str] = []
+
+    def broken(key: str) -> None:
+        raise OSError("shared memory is gone")
+
+    invalidator.add_target(broken)
+    invalidator.add_target(evicted.append)
+    invalidator.evict(["one", "two"])
+    assert evicted == ["one", "two"]
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from contextlib import AbstractAsyncContextManager
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from task1_fastapi.app.pools import AcquireLimiter, PoolCapacity, PoolSaturatedError
+from task1_fastapi.bench.fake_pool import FakePool, fixed_latency
+
+pytestmark = pytest.mark.anyio
+
+
+def fake_pool(size: int) -> FakePool:
+    return FakePool(size, latency=fixed_latency(0.0))
+
+
+async def test_limiter_rejects_when_queue_is_full() -> None:
+    pool = fake_pool(1)
+    limiter = AcquireLimiter(max_waiters=1, retry_after=3)
+    connection = await limiter.acquire(pool)
+    waiter = asyncio.create_task(limiter.acquire(pool))
+    await asyncio.sleep(0)
+    with pytest.raises(PoolSaturatedError) as info:
+        await limiter.acquire(pool)
+    assert (info.value.reason, info.value.retry_after) == ("queue_full", 3)
+    assert limiter.rejected_queue_full == 1
+    await limiter.release(pool, connection)
+    await limiter.release(pool, await waiter)
+    assert limiter.checked_out == 0
+
+
+async def test_zero_waiters_still_hands_out_idle_connections() -> None:
+    pool = fake_pool(2)
+    limiter = AcquireLimiter(max_waiters=0)
+    first = await limiter.acquire(pool)
+    second = await limiter.acquire(pool)
+    with pytest.raises(PoolSaturatedError) as info:
+        await limiter.acquire(pool)
+    assert info.value.reason == "queue_full"
+    await limiter.release(pool, first)
+    await limiter.release(pool, await limiter.acquire(pool))
+    await limiter.release(pool, second)
+
+
+async def test_concurrent_acquires_of_idle_connections_do_not_queue() -> None:
+    pool = fake_pool(5)
+    limiter = AcquireLimiter(max_waiters=0)
+    connections = await asyncio.gather(*(limiter.acquire(pool) for _ in range(5)))
+    assert limiter.checked_out == 5
+    assert limiter.rejected_queue_full == 0
+    for connection in connections:
+        await limiter.release(pool, connection)
+
+
+async def test_limiter_times_out_waiting_for_a_connection() -> None:
+    pool = fake_pool(1)
+    limiter = AcquireLimiter(timeout=0.01)
+    connection = await limiter.acquire(pool)
+    with pytest.raises(PoolSaturatedError) as info:
+        await limiter.acquire(pool)
+    assert info.value.reason == "timeout"
+    assert limiter.rejected_timeout == 1
+    assert limiter.waiters == 0
+    await limiter.release(pool, connection)
+
+
+async def test_capacity_queues_past_limit_and_wakes_in_order() -> None:
+    capacity = PoolCapacity(1)
+    await capacity.acquire()
+    order: list[int] = []
+
+    async def wait(index: int) -> None:
+        await capacity.acquire()
+        order.append(index)
+
+    waiters = [asyncio.create_task(wait(index)) for index in range(2)]
+    await asyncio.sleep(0)
+    assert capacity.queued == 2
+    capacity.release()
+    await asyncio.sleep(0)
+    capacity.release()
+    await asyncio.gather(*waiters)
+    assert order == [0, 1]
+    assert capacity.in_use == 1
+    assert capacity.window_peak == 1
+
+
+async def test_capacity_resize_wakes_waiters() -> None:
+    capacity = PoolCapacity(1)
+    await capacity.acquire()
+    waiter = asyncio.create_task(capacity.acquire())
+    await asyncio.sleep(0)
+    capacity.resize(2)
+    await waiter
+    assert capacity.in_use == 2
+    with pytest.raises(ValueError):
+        capacity.resize(0)
+
+
+async def test_cancelled_capacity_waiter_leaves_the_queue() -> None:
+    capacity = PoolCapacity(1)
+    await capacity.acquire()
+    waiter = asyncio.create_task(capacity.acquire())
+    await asyncio.sleep(0)
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+    assert capacity.queued == 0
+    capacity.release()
+    assert capacity.in_use == 0
+
+
+async def test_slot_handed_to_a_cancelled_waiter_is_passed_on() -> None:
+    capacity = PoolCapacity(1)
+    await capacity.acquire()
+    first = asyncio.create_task(capacity.acquire())
+    second = asyncio.create_task(capacity.acquire())
+    await asyncio.sleep(0)
+    # The slot is handed to ``first`` before it gets to run, then it is cancelled.
+    capacity.release()
+    first.cancel()
+    await asyncio.gather(first, return_exceptions=True)
+    await second
+    assert capacity.in_use == 1
+    assert capacity.queued == 0
+
+
+async def test_limiter_timeout_covers_the_capacity_queue() -> None:
+    pool = fake_pool(2)
+    capacity = PoolCapacity(1)
+    limiter = AcquireLimiter(timeout=0.01)
+    limiter.set_capacity(pool, capacity)
+    connection = await limiter.acquire(pool)
+    with pytest.raises(PoolSaturatedError):
+        await limiter.acquire(pool)
+    assert capacity.queued == 0
+    await limiter.release(pool, connection)
+    assert capacity.in_use == 0
+    assert capacity.window_waits == 1
+
+
+async def test_zero_waiters_respects_the_capacity_limit() -> None:
+    pool = fake_pool(2)
+    capacity = PoolCapacity(1)
+    limiter = AcquireLimiter(max_waiters=0)
+    limiter.set_capacity(pool, capacity)
+    connection = await limiter.acquire(pool)
+    with pytest.raises(PoolSaturatedError) as info:
+        await limiter.acquire(pool)
+    assert info.value.reason == "queue_full"
+    await limiter.release(pool, connection)
+
+
+async def test_drain_waits_for_checked_out_connections() -> None:
+    pool = fake_pool(2)
+    limiter = AcquireLimiter()
+    connection = await limiter.acquire(pool)
+    drain = asyncio.create_task(limiter.drain(5.0))
+    await asyncio.sleep(0)
+    with pytest.raises(PoolSaturatedError) as info:
+        await limiter.acquire(pool)
+    assert info.value.reason == "draining"
+    await limiter.release(pool, connection)
+    result = await drain
+    assert (result.drained, result.aborted) == (1, 0)
+
+
+async def test_drain_gives_up_after_grace() -> None:
+    pool = fake_pool(1)
+    limiter = AcquireLimiter()
+    await limiter.acquire(pool)
+    result = await limiter.drain(0.01)
+    assert (result.drained, result.aborted) == (0, 1)
+
+
+async def test_later_drain_only_waits_for_the_rest_of_the_grace() -> None:
+    pool = fake_pool(1)
+    limiter = AcquireLimiter()
+    await limiter.acquire(pool)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    await limiter.drain(0.05)
+    # The grace period already ran out, so a second call returns at once.
+    result = await limiter.drain(10.0)
+    assert loop.time() - started < 1.0
+    assert result.aborted == 1
+
+
+async def test_readiness_fails_once_shutdown_begins(
+    make_app: Callable[..., FastAPI],
+    serve: Callable[[FastAPI], AbstractAsyncContextManager[httpx.AsyncClient]],
+) -> None:
+    app = make_app()
+    async with serve(app) as client:
+        assert (await client.get("/readyz")).status_code == 200
+        await app.state.begin_shutdown()
+        response = await client.get("/readyz")
+        rejected = await client.get("/api/db_version")
+    assert response.status_code == 503
+    assert response.json() == {"status": "draining"}
+    assert rejected.status_code == 503
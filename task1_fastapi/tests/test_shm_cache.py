@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+from collections.abc import Iterator
+from multiprocessing.synchronize import Event
+from pathlib import Path
+
+import pytest
+from task1_fastapi.app.shm_cache import HEADER_SIZE, SharedMemoryCache, _key_hash
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def path(tmp_path: Path) -> str:
+    return str(tmp_path / "cache")
+
+
+@pytest.fixture
+def cache(path: str) -> Iterator[SharedMemoryCache]:
+    cache = SharedMemoryCache(path, slots=8, slot_size=256)
+    yield cache
+    cache.close()
+
+
+def test_set_get_delete(cache: SharedMemoryCache) -> None:
+    assert cache.get("key") is None
+    assert cache.set("key", b"value", 60)
+    assert cache.get("key") == b"value"
+    cache.delete("key")
+    assert cache.get("key") is None
+
+
+def test_entries_expire(path: str) -> None:
+    clock = FakeClock()
+    cache = SharedMemoryCache(path, slots=8, slot_size=256, clock=clock)
+    cache.set("key", b"value", 5)
+    clock.now += 5
+    assert cache.get("key") is None
+    cache.close()
+
+
+def test_oversized_item_is_not_stored(cache: SharedMemoryCache) -> None:
+    assert not cache.set("key", b"x" * cache.max_item_size, 60)
+    assert cache.get("key") is None
+
+
+def test_colliding_key_is_a_miss(cache: SharedMemoryCache) -> None:
+    keys = [f"key{index}" for index in range(100)]
+    slot = _key_hash(keys[0].encode()) % 8
+    other = next(key for key in keys[1:] if _key_hash(key.encode()) % 8 == slot)
+    cache.set(keys[0], b"first", 60)
+    assert cache.get(other) is None
+    cache.set(other, b"second", 60)
+    assert cache.get(keys[0]) is None
+    assert cache.get(other) == b"second"
+
+
+def test_workers_share_entries(path: str, cache: SharedMemoryCache) -> None:
+    other = SharedMemoryCache(path, slots=8, slot_size=256)
+    cache.set("key", b"value", 60)
+    assert other.get("key") == b"value"
+    other.close()
+
+
+def test_reader_misses_while_slot_is_being_written(cache: SharedMemoryCache) -> None:
+    cache.set("key", b"old", 60)
+    offset = cache._slot_offset(_key_hash(b"key"))
+    with cache._write(offset):
+        assert cache.get("key") is None
+    assert cache.get("key") == b"old"
+
+
+def _write_forever(path: str, values: list[bytes], stop: Event) -> None:
+    cache = SharedMemoryCache(path, slots=8, slot_size=256)
+    while not stop.is_set():
+        for value in values:
+            cache.set("key", value, 60)
+    cache.close()
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="needs the fork start method"
+)
+def test_reader_never_sees_a_torn_value(path: str, cache: SharedMemoryCache) -> None:
+    values = [bytes([byte]) * 200 for byte in b"abcd"]
+    context = multiprocessing.get_context("fork")
+    stop = context.Event()
+    writer = context.Process(target=_write_forever, args=(path, values, stop))
+    writer.start()
+    try:
+        seen = set()
+        for _ in range(20_000):
+            value = cache.get("key")
+            if value is not None:
+                assert value in values
+                seen.add(value)
+    finally:
+        stop.set()
+        writer.join()
+    assert seen
+
+
+def test_file_with_another_layout_is_replaced(path: str, cache: SharedMemoryCache) -> None:
+    cache.set("key", b"value", 60)
+    resized = SharedMemoryCache(path, slots=4, slot_size=128)
+    assert os.path.getsize(path) == HEADER_SIZE + 4 * 128
+    assert resized.get("key") is None
+    resized.set("key", b"new", 60)
+    # A process still mapping the old layout keeps working on its own copy.
+    assert cache.get("key") == b"value"
+    reopened = SharedMemoryCache(path, slots=4, slot_size=128)
+    assert reopened.get("key") == b"new"
+    assert os.listdir(os.path.dirname(path)) == ["cache"]
+    resized.close()
+    reopened.close()
+
+
+def test_file_with_garbage_header_is_replaced(path: str) -> None:
+    with open(path, "wb") as file:
+        file.write(os.urandom(HEADER_SIZE))
+    cache = SharedMemoryCache(path, slots=8, slot_size=256)
+    cache.set("key", b"value", 60)
+    assert cache.get("key") == b"value"
+    cache.close()
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from collections.abc import Callable
+from contextlib import AbstractAsyncContextManager
+from typing import Any
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from task1_fastapi.app import tenants as tenants_module
+from task1_fastapi.app.pools import PoolSaturatedError
+from task1_fastapi.app.settings import PostgresSettings, TenantSettings
+from task1_fastapi.app.statements import StatementRegistry
+from task1_fastapi.app.tenants import TenantPoolManager, UnknownTenantError
+from task1_fastapi.bench.fake_pool import FakePool, fake_pool_factory, fixed_latency
+
+pytestmark = pytest.mark.anyio
+
+DSNS = {name: f"postgresql://{name}" for name in ("a", "b", "c")}
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def created(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """Replace tenant pool creation with fake pools and record the DSNs opened."""
+    dsns: list[str] = []
+
+    async def create_pg_pool(*_: Any, dsn: str, max_size: int, **__: Any) -> FakePool:
+        dsns.append(dsn)
+        await asyncio.sleep(0)
+        return FakePool(max_size, latency=fixed_latency(0.0))
+
+    monkeypatch.setattr(tenants_module, "create_pg_pool", create_pg_pool)
+    return dsns
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def manager(app_env: pytest.MonkeyPatch, clock: FakeClock) -> TenantPoolManager:
+    return TenantPoolManager(
+        DSNS,
+        PostgresSettings(),
+        StatementRegistry(),
+        pool_max_size=2,
+        max_connections=4,
+        idle_timeout=60.0,
+        clock=clock,
+    )
+
+
+async def test_pool_is_created_once_per_tenant(
+    manager: TenantPoolManager, created: list[str]
+) -> None:
+    pools = await asyncio.gather(*(manager.get_pool("a") for _ in range(3)))
+    assert pools[0] is pools[1] is pools[2]
+    assert created == ["postgresql://a"]
+    assert manager.reserved == 2
+
+
+async def test_unknown_tenant(manager: TenantPoolManager, created: list[str]) -> None:
+    with pytest.raises(UnknownTenantError):
+        await manager.get_pool("nope")
+    assert created == []
+
+
+async def test_least_recently_used_idle_pool_makes_room(
+    manager: TenantPoolManager, created: list[str], clock: FakeClock
+) -> None:
+    pool_a = await manager.get_pool("a")
+    await manager.get_pool("b")
+    clock.now += 5
+    assert await manager.get_pool("a") is pool_a
+    clock.now += 5
+    await manager.get_pool("c")
+    assert manager.evictions == 1
+    assert manager.pool_count == 2
+    # "b" was evicted, so it is opened again.
+    await manager.get_pool("b")
+    assert created[-1] == "postgresql://b"
+
+
+async def test_budget_is_exhausted_while_pools_are_busy(
+    manager: TenantPoolManager, created: list[str], clock: FakeClock
+) -> None:
+    pool_a = await manager.get_pool("a")
+    await manager.get_pool("b")
+    clock.now += 5
+    # "a" has a connection checked out and "b" was used within the eviction grace.
+    connection = await pool_a.acquire()
+    await manager.get_pool("b")
+    with pytest.raises(PoolSaturatedError) as info:
+        await manager.get_pool("c")
+    assert info.value.reason == "tenant_budget"
+    await pool_a.release(connection)
+
+
+async def test_idle_pools_are_swept(
+    manager: TenantPoolManager, created: list[str], clock: FakeClock
+) -> None:
+    await manager.get_pool("a")
+    clock.now += 30
+    await manager.get_pool("b")
+    clock.now += 30
+    await manager.evict_idle()
+    assert manager.pool_count == 1
+    await manager.close()
+    assert manager.pool_count == 0
+
+
+def test_budget_is_split_across_workers(app_env: pytest.MonkeyPatch) -> None:
+    app_env.setenv("DB_TENANT_MAX_CONNECTIONS", "40")
+    app_env.setenv("DB_TENANT_POOL_MAX_SIZE", "8")
+    settings = TenantSettings().for_workers(4)
+    assert (settings.max_connections, settings.pool_max_size) == (10, 2)
+    assert TenantSettings().for_workers(1).max_connections == 40
+
+
+def version_rows(version: str) -> Callable[[str, tuple[Any, ...]], list[dict[str, Any]]]:
+    def rows(query: str, args: tuple[Any, ...]) -> list[dict[str, Any]]:
+        if "version()" in query:
+            return [{"version": version}]
+        return [{"name": version, "setting": "1", "unit": None, "category": "test"}]
+
+    return rows
+
+
+async def test_tenant_header_routes_reads_and_cache_entries(
+    app_env: pytest.MonkeyPatch,
+    make_app: Callable[..., FastAPI],
+    serve: Callable[[FastAPI], AbstractAsyncContextManager[httpx.AsyncClient]],
+) -> None:
+    app_env.setenv("DB_TENANT_DSNS", json.dumps({"acme": "postgresql://acme"}))
+    app_env.setattr(
+        tenants_module,
+        "create_pg_pool",
+        fake_pool_factory(fixed_latency(0.0), version_rows("tenant")),
+    )
+    app = make_app(version_rows("primary"))
+    async with serve(app) as client:
+        primary = await client.get("/api/db_version")
+        tenant = await client.get("/api/db_version", headers={"X-Tenant": "acme"})
+        unknown = await client.get("/api/db_version", headers={"X-Tenant": "nope"})
+        export = await client.get("/api/export/pg_settings", headers={"X-Tenant": "acme"})
+    assert primary.json() == {"version": "primary"}
+    assert tenant.json() == {"version": "tenant"}
+    assert unknown.status_code == 404
+    assert json.loads(export.text.splitlines()[0])["name"] == "tenant"
+    assert sorted(app.state.db_version_cache._entries) == ["db_version", "db_version:acme"]